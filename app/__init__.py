@@ -1,3 +1,6 @@
+import time
+_INICIO_IMPORTACION = time.perf_counter()
+
 from flask import Flask
 from flask_login import LoginManager
 # CAMBIO AQUÍ: Importamos el archivo específico dentro de la carpeta config
@@ -5,7 +8,18 @@ from app.config.mongo_spark_conexion_sinnulos import config
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+from contextlib import contextmanager
 from flask_mail import Mail
+from app.compresion import compresion
+from app import plantillas, estaticos
+from app.imagenes import procesador_imagenes, cache_imagenes
+from app.recolector_imagenes import recolector_imagenes
+from app.sugerencias import indice_sugerencias
+from app.catalogo import catalogo_tienda
+from app.busquedas import cache_busquedas
+
+# Tiempo que tarda en importarse el paquete (Flask, extensiones y configuración)
+_TIEMPO_IMPORTACION = time.perf_counter() - _INICIO_IMPORTACION
 
 # Inicializar extensiones
 login_manager = LoginManager()
@@ -26,11 +40,43 @@ def load_user(user_id):
         return UserWrapper(usuario_dict)
     return None
 
-def create_app(config_name='default'):
-    """Factory function para crear la aplicación Flask"""
+class PerfilArranque:
+    """Registra la duración de cada fase del arranque de la aplicación"""
     
-    app = Flask(__name__)
+    def __init__(self):
+        self.fases = [('importaciones', _TIEMPO_IMPORTACION)]
     
+    @contextmanager
+    def fase(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nombre, time.perf_counter() - inicio))
+    
+    @property
+    def total(self):
+        return sum(duracion for _, duracion in self.fases)
+    
+    def reporte(self):
+        """Devuelve el perfil de arranque como texto tabulado (milisegundos)"""
+        lineas = ['Perfil de arranque:']
+        for nombre, duracion in self.fases:
+            lineas.append(f'   {nombre:<20} {duracion * 1000:8.1f} ms')
+        lineas.append(f'   {"total":<20} {self.total * 1000:8.1f} ms')
+        return '\n'.join(lineas)
+
+
+def _publicar_perfil(app, perfil):
+    """Guarda el perfil en la app y lo muestra si se pidió con PERFIL_ARRANQUE=1"""
+    app.extensions['perfil_arranque'] = perfil
+    app.logger.debug(perfil.reporte())
+    if os.environ.get('PERFIL_ARRANQUE'):
+        print(perfil.reporte())
+
+
+def cargar_configuracion(app, config_name):
+    """Cargar la configuración base y las rutas de subida de imágenes"""
     # Cargar configuración desde el diccionario 'config' que importamos arriba
     app.config.from_object(config[config_name])
     
@@ -44,6 +90,43 @@ def create_app(config_name='default'):
     app.config['UPLOAD_FOLDER'] = os.path.join(app.static_folder, 'uploads')
     app.config['PLANTAS_UPLOAD_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'plantas')
     app.config['USERS_UPLOAD_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'usuarios')
+    # Variantes permitidas para /img/<planta_id>/<ancho>x<alto>.<formato> (evita llenar la caché)
+    app.config['IMAGE_SIZES_PERMITIDOS'] = {(160, 160), (320, 240), (400, 300), (400, 400), (640, 480), (800, 600)}
+    app.config['IMAGE_FORMATOS_PERMITIDOS'] = {'webp', 'jpg'}
+
+
+def create_cli_app(config_name='default'):
+    """Factory mínima para scripts, cron y el proceso del planificador.
+    
+    Solo carga configuración, logging y carpetas: no registra blueprints
+    (evita importar app.routes), no crea datos por defecto ni arranca
+    el planificador de respaldos en segundo plano.
+    """
+    perfil = PerfilArranque()
+    
+    with perfil.fase('flask'):
+        app = Flask(__name__)
+    with perfil.fase('configuracion'):
+        cargar_configuracion(app, config_name)
+    with perfil.fase('logging'):
+        configure_logging(app)
+    with perfil.fase('carpetas'):
+        setup_folders(app)
+    
+    _publicar_perfil(app, perfil)
+    return app
+
+
+def create_app(config_name='default'):
+    """Factory function para crear la aplicación Flask"""
+    perfil = PerfilArranque()
+    
+    with perfil.fase('flask'):
+        app = Flask(__name__)
+    with perfil.fase('configuracion'):
+        cargar_configuracion(app, config_name)
+    with perfil.fase('plantillas'):
+        plantillas.init_app(app)
     
     @app.context_processor
     def inject_datetime():
@@ -58,15 +141,30 @@ def create_app(config_name='default'):
             'config': app.config
         }
         
-    login_manager.init_app(app)
-    mail.init_app(app)
-    
-    configure_logging(app)
-    register_blueprints(app)
-    setup_folders(app)
-    setup_database(app)
-    setup_backup_scheduler(app)
+    with perfil.fase('extensiones'):
+        login_manager.init_app(app)
+        mail.init_app(app)
+        # estaticos antes que compresion: en modo X-Accel el proxy sirve también los .br/.gz
+        estaticos.init_app(app)
+        compresion.init_app(app)
+        procesador_imagenes.init_app(app)
+        cache_imagenes.init_app(app)
+        recolector_imagenes.init_app(app)
+        indice_sugerencias.init_app(app)
+        catalogo_tienda.init_app(app)
+        cache_busquedas.init_app(app)
+    with perfil.fase('logging'):
+        configure_logging(app)
+    with perfil.fase('blueprints'):
+        register_blueprints(app)
+    with perfil.fase('carpetas'):
+        setup_folders(app)
+    with perfil.fase('base_de_datos'):
+        setup_database(app)
+    with perfil.fase('planificador'):
+        setup_backup_scheduler(app)
     
+    _publicar_perfil(app, perfil)
     return app
 
 # ... (El resto de tus funciones configure_logging, register_blueprints, etc., se mantienen igual)
@@ -122,6 +220,9 @@ def register_blueprints(app):
         app.logger.warning(f'Blueprint de tienda no encontrado: {e}')
     except Exception as e:
         app.logger.error(f'Error al registrar blueprint de tienda: {str(e)}')
+    
+    from app.api import api_bp
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
 
 def setup_folders(app):
     """Crear y verificar carpetas necesarias"""
@@ -145,10 +246,23 @@ def setup_database(app):
         try:
             # En MongoDB no hace falta db.create_all()
             app.logger.info('Conexión a MongoDB inicializada exitosamente')
+            crear_indices(app)
             create_default_data(app)
         except Exception as e:
             app.logger.error(f'Error al configurar base de datos: {str(e)}')
 
+def crear_indices(app):
+    """Crear (si faltan) los índices que usan las consultas de la aplicación"""
+    from app.models import PlantaModel, ResumenRiegoModel, BusquedaModel, CategoriaTiendaModel
+    
+    try:
+        PlantaModel.crear_indices()
+        CategoriaTiendaModel.crear_indices()
+        ResumenRiegoModel.crear_indices()
+        BusquedaModel.crear_indices()
+    except Exception as e:
+        app.logger.error(f'Error creando índices: {str(e)}')
+
 def create_default_data(app):
     """Crear datos por defecto en MongoDB"""
     from app.models import UsuarioModel
@@ -206,6 +320,25 @@ def setup_backup_scheduler(app):
     except Exception as e:
         app.logger.error(f'Error al iniciar el planificador de respaldos: {str(e)}')
     
+    # El recolector de imágenes huérfanas comparte las condiciones de arranque del planificador
+    if not app.testing and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        try:
+            recolector_imagenes.start()
+        except Exception as e:
+            app.logger.error(f'Error al iniciar el recolector de imágenes: {str(e)}')
+        try:
+            # Tras el arranque y cada cambio del catálogo se recalculan las categorías marcadas
+            # por las escrituras y se precalientan las búsquedas populares
+            from app.models import CategoriaTiendaModel
+            catalogo_tienda.al_actualizar.append(CategoriaTiendaModel.refrescar_pendientes)
+            # Las sugerencias del buscador se actualizan aquí y no en la petición
+            indice_sugerencias.en_segundo_plano = True
+            catalogo_tienda.al_actualizar.append(indice_sugerencias.actualizar)
+            catalogo_tienda.al_actualizar.append(cache_busquedas.precalentar)
+            catalogo_tienda.start()
+        except Exception as e:
+            app.logger.error(f'Error al iniciar el catálogo de la tienda: {str(e)}')
+    
     @app.teardown_appcontext
     def shutdown_scheduler(exception=None):
         try:
@@ -0,0 +1,144 @@
+# app/api.py
+import base64
+import binascii
+import json
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from flask import Blueprint, request, jsonify
+from app.cache_http import respuesta_condicional
+from app.catalogo import catalogo_tienda
+from app.models import PlantaModel, COLACION_ES
+
+api_bp = Blueprint('api', __name__)
+
+LIMITE_DEFECTO = 24
+LIMITE_MAXIMO = 100
+
+# Campos que se pueden pedir con ?fields= (nombre en la API -> campo del documento)
+CAMPOS_API = {
+    'id': '_id', 'nombre': 'nombre', 'especie': 'especie', 'categoria': 'categoria',
+    'precio': 'precio', 'stock': 'stock', 'descripcion': 'descripcion',
+    'imagen_url': 'imagen_url', 'imagenes': 'imagenes', 'fecha_actualizacion': 'fecha_actualizacion'
+}
+# Con estos campos la consulta se resuelve solo con el índice (api_venta_*)
+CAMPOS_DEFECTO = ('id', 'nombre', 'categoria', 'precio', 'stock')
+
+# Orden de la paginación por cursor: campo de orden y desempate por _id
+ORDENES_API = {'id': None, 'nombre': 'nombre', 'precio': 'precio'}
+
+
+class ErrorParametro(ValueError):
+    pass
+
+
+def codificar_cursor(valor, planta_id):
+    crudo = json.dumps([valor, str(planta_id)], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, planta_id = json.loads(crudo)
+        return valor, ObjectId(planta_id)
+    except (binascii.Error, ValueError, TypeError, InvalidId):
+        raise ErrorParametro('Cursor inválido')
+
+
+def _filtro_cursor(campo, valor, planta_id):
+    """Documentos posteriores a (valor, _id) en el orden ascendente (campo, _id)"""
+    if campo is None:
+        return {"_id": {"$gt": planta_id}}
+    return {"$or": [
+        {campo: {"$gt": valor}},
+        {campo: valor, "_id": {"$gt": planta_id}}
+    ]}
+
+
+def _parametros():
+    campos = request.args.get('fields')
+    campos = [c.strip() for c in campos.split(',') if c.strip()] if campos else list(CAMPOS_DEFECTO)
+    desconocidos = [c for c in campos if c not in CAMPOS_API]
+    if desconocidos:
+        raise ErrorParametro(f"Campos desconocidos: {', '.join(desconocidos)}")
+
+    orden = request.args.get('orden', 'id')
+    if orden not in ORDENES_API:
+        raise ErrorParametro(f"orden debe ser uno de: {', '.join(ORDENES_API)}")
+
+    limite = request.args.get('limit', LIMITE_DEFECTO, type=int)
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        raise ErrorParametro(f'limit debe estar entre 1 y {LIMITE_MAXIMO}')
+
+    return {
+        'q': request.args.get('q', ''),
+        'precio_min': request.args.get('precio_min', type=float),
+        'precio_max': request.args.get('precio_max', type=float),
+        'categoria': request.args.get('categoria', ''),
+        'campos': campos,
+        'orden': orden,
+        'limite': limite,
+        'cursor': request.args.get('cursor')
+    }
+
+
+def consultar_plantas(q='', precio_min=None, precio_max=None, categoria='', campos=CAMPOS_DEFECTO,
+                      orden='id', limite=LIMITE_DEFECTO, cursor=None):
+    """Una página del catálogo por keyset; devuelve (plantas, cursor siguiente o None).
+
+    Filtros de PlantaModel.filtro_busqueda. Sin búsqueda de texto, con los campos por
+    defecto, la consulta la cubre un índice api_venta_* (no lee documentos).
+    """
+    filtro, modo = PlantaModel.filtro_busqueda(q, precio_min, precio_max, categoria)
+    campo_orden = ORDENES_API[orden]
+    if cursor:
+        valor, planta_id = decodificar_cursor(cursor)
+        # filtro_busqueda no usa $or ni _id: se puede fusionar sin $and ($text debe quedar arriba)
+        filtro.update(_filtro_cursor(campo_orden, valor, planta_id))
+
+    proyeccion = {CAMPOS_API[c]: 1 for c in campos}
+    proyeccion['_id'] = 1
+    if campo_orden:
+        proyeccion[campo_orden] = 1
+    clave_orden = ([(campo_orden, 1)] if campo_orden else []) + [("_id", 1)]
+
+    # El rango por prefijo del nombre necesita la colación 'es'; $text no la admite
+    opciones = {'collation': COLACION_ES} if modo == 'prefijo' else {}
+    documentos = list(PlantaModel._get_collection()
+                      .find(filtro, proyeccion, **opciones)
+                      .sort(clave_orden)
+                      .limit(limite + 1))
+
+    siguiente = None
+    if len(documentos) > limite:
+        documentos = documentos[:limite]
+        ultimo = documentos[-1]
+        siguiente = codificar_cursor(ultimo.get(campo_orden) if campo_orden else None, ultimo['_id'])
+
+    plantas = []
+    for doc in documentos:
+        planta = {c: doc.get(CAMPOS_API[c]) for c in campos}
+        if 'id' in planta:
+            planta['id'] = str(doc['_id'])
+        plantas.append(planta)
+    return plantas, siguiente
+
+
+def validadores_api(*args, **kwargs):
+    """ETag por revisión del catálogo en memoria (la ruta y los parámetros entran en el hash)"""
+    revision, actualizado = catalogo_tienda.revision()
+    return ('api', revision, actualizado), actualizado
+
+
+@api_bp.route('/plantas')
+@respuesta_condicional(validadores_api)
+def listar_plantas():
+    """Catálogo a la venta: ?q, precio_min, precio_max, categoria, fields, orden, limit, cursor"""
+    try:
+        parametros = _parametros()
+        plantas, siguiente = consultar_plantas(**parametros)
+    except ErrorParametro as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    # La compresión gzip/br la negocia app.compresion para toda respuesta JSON
+    return jsonify({'success': True, 'plantas': plantas, 'siguiente': siguiente, 'limit': parametros['limite']})
@@ -0,0 +1,95 @@
+# app/busquedas.py
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from app.cache import CacheLRU
+from app.catalogo import catalogo_tienda
+from app.models import PlantaModel, BusquedaModel
+from app.sugerencias import normalizar
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_consulta(texto):
+    """'  Orquídea   Blanca' -> 'orquidea blanca': minúsculas, sin acentos ni espacios repetidos"""
+    return ' '.join(normalizar(texto).split())[:100]
+
+
+class CacheBusquedas:
+    """Resultados del buscador de la tienda cacheados por consulta normalizada.
+
+    La clave es (revisión del catálogo, consulta, rango de precio, categoría, página),
+    así que una escritura de plantas invalida todo sin recorrer la caché. Como $text y
+    la colación 'es' ya ignoran acentos y mayúsculas, "Orquídea" y "orquidea" comparten
+    entrada. Las búsquedas se registran por lotes para resumirlas a diario y precalentar
+    las más frecuentes cuando el catálogo cambia (y al arrancar).
+    """
+
+    def __init__(self, app=None):
+        self.resultados = CacheLRU('busquedas', max_entradas=500, ttl=300)
+        self.precalentar_top = 20
+        self.max_pendientes = 50
+        self.intervalo_volcado = 10
+        self._pendientes = []
+        self._volcado = time.monotonic()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.resultados.max_entradas = app.config.setdefault('BUSQUEDAS_CACHE_MAX', 500)
+        self.resultados.ttl = app.config.setdefault('BUSQUEDAS_CACHE_TTL', 300)
+        self.precalentar_top = app.config.setdefault('BUSQUEDAS_PRECALENTAR', 20)
+
+    @staticmethod
+    def _clave(consulta, precio_min, precio_max, categoria, page, per_page):
+        precios = tuple(None if p is None else round(float(p), 2) for p in (precio_min, precio_max))
+        return (consulta,) + precios + ((categoria or '').strip(), page, per_page)
+
+    def buscar(self, query, precio_min=None, precio_max=None, categoria='', page=1, per_page=24):
+        """Misma respuesta que PlantaModel.buscar_con_facetas, servida desde la caché si se puede"""
+        consulta = normalizar_consulta(query)
+        revision, _ = catalogo_tienda.revision()
+        clave = (revision,) + self._clave(consulta, precio_min, precio_max, categoria, page, per_page)
+        return self.resultados.get_or_set(clave, lambda: PlantaModel.buscar_con_facetas(
+            consulta, precio_min, precio_max, (categoria or '').strip(), page, per_page
+        ))
+
+    def registrar(self, query, categoria, resultados):
+        """Anota la búsqueda en memoria; se escribe en search_log por lotes"""
+        consulta = normalizar_consulta(query)
+        if not consulta:
+            return
+        with self._lock:
+            self._pendientes.append({
+                'consulta': consulta,
+                'categoria': categoria or None,
+                'resultados': resultados,
+                'fecha': datetime.utcnow()
+            })
+            if (len(self._pendientes) < self.max_pendientes
+                    and time.monotonic() - self._volcado < self.intervalo_volcado):
+                return
+        self.volcar()
+
+    def volcar(self):
+        with self._lock:
+            lote, self._pendientes = self._pendientes, []
+            self._volcado = time.monotonic()
+        try:
+            BusquedaModel.registrar_lote(lote)
+        except Exception as e:
+            logger.error(f"No se pudo guardar el registro de búsquedas: {e}")
+
+    def precalentar(self, dias=7):
+        """Ejecuta las consultas más frecuentes de los últimos días para dejarlas en caché"""
+        populares = BusquedaModel.populares(datetime.utcnow() - timedelta(days=dias), self.precalentar_top)
+        for consulta in populares:
+            self.buscar(consulta)
+        logger.info(f"Búsquedas precalentadas: {len(populares)}")
+        return populares
+
+
+# Instancia global
+cache_busquedas = CacheBusquedas()
@@ -0,0 +1,90 @@
+# app/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+# Registro de todas las cachés en memoria, para exponer sus métricas
+CACHES = {}
+
+
+class CacheLRU:
+    """Caché LRU en memoria del proceso, segura entre hilos y con métricas de aciertos.
+
+    Con `ttl` (segundos) además caduca cada entrada ese tiempo después de guardarla.
+    """
+
+    def __init__(self, nombre, max_entradas=1000, ttl=None):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        # clave -> (valor, instante de caducidad o None)
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.caducadas = 0
+        CACHES[nombre] = self
+
+    def get(self, clave, default=None):
+        with self._lock:
+            try:
+                valor, caduca = self._datos[clave]
+            except KeyError:
+                self.fallos += 1
+                return default
+            if caduca is not None and caduca <= time.monotonic():
+                del self._datos[clave]
+                self.caducadas += 1
+                self.fallos += 1
+                return default
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def set(self, clave, valor):
+        caduca = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, caduca)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def get_or_set(self, clave, funcion):
+        """Devuelve el valor cacheado o lo calcula con funcion() y lo guarda"""
+        centinela = object()
+        valor = self.get(clave, centinela)
+        if valor is centinela:
+            valor = funcion()
+            self.set(clave, valor)
+        return valor
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._datos),
+            'max_entradas': self.max_entradas,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'expulsiones': self.expulsiones,
+            'caducadas': self.caducadas,
+            'ttl': self.ttl,
+            'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0
+        }
+
+
+def estadisticas_caches():
+    """Métricas de todas las cachés registradas"""
+    return {nombre: cache.estadisticas() for nombre, cache in CACHES.items()}
@@ -0,0 +1,61 @@
+# app/cache_http.py
+import hashlib
+from functools import wraps
+from flask import request, session, make_response
+from flask_login import current_user
+from werkzeug.wrappers import Response
+
+
+def calcular_etag(semilla):
+    """ETag a partir de la semilla de la vista, la ruta, los parámetros y el usuario"""
+    usuario = current_user.get_id() if current_user.is_authenticated else None
+    parametros = sorted(request.args.items(multi=True))
+    huella = repr((semilla, request.path, parametros, usuario)).encode('utf-8')
+    return hashlib.sha1(huella).hexdigest()
+
+
+def _no_modificado(etag, ultima_modificacion):
+    # Si el cliente envía If-None-Match, If-Modified-Since se ignora (RFC 7232)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if ultima_modificacion and request.if_modified_since:
+        return ultima_modificacion.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _aplicar_validadores(respuesta, etag, ultima_modificacion):
+    respuesta.set_etag(etag, weak=True)
+    if ultima_modificacion:
+        respuesta.last_modified = ultima_modificacion
+    # Privada (depende del usuario) y siempre revalidada: la revalidación es un 304 barato
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+def respuesta_condicional(validadores):
+    """Decorador para vistas GET que responde 304 sin ejecutar la vista.
+
+    `validadores` recibe los mismos argumentos que la vista y devuelve
+    (semilla, ultima_modificacion). Debe ser barato: una lectura por _id o
+    un conteo, nunca la consulta principal ni el renderizado.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            # Con mensajes flash pendientes la página sí cambia aunque los datos no
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return vista(*args, **kwargs)
+
+            semilla, ultima_modificacion = validadores(*args, **kwargs)
+            etag = calcular_etag(semilla)
+
+            if _no_modificado(etag, ultima_modificacion):
+                return _aplicar_validadores(Response(status=304), etag, ultima_modificacion)
+
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code == 200:
+                _aplicar_validadores(respuesta, etag, ultima_modificacion)
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,153 @@
+# app/catalogo.py
+import logging
+import threading
+import time
+from app.models import PlantaModel, RevisionModel, CAMPOS_TARJETA, FILTRO_VENTA, slug_categoria
+from app.sugerencias import normalizar
+
+logger = logging.getLogger(__name__)
+
+ORDENES_CATALOGO = ('nombre', 'precio_asc', 'precio_desc')
+
+
+class CatalogoTienda:
+    """Instantánea en memoria del catálogo a la venta para la portada de la tienda.
+
+    Guarda las plantas en forma de tarjeta ya ordenadas para cada orden admitido y
+    las categorías calculadas. Un hilo en segundo plano la reconstruye cuando cambia
+    la revisión del catálogo y la sustituye de una vez, así que servir una página es
+    solo recortar una lista, sin consultar MongoDB.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.intervalo = 5
+        # {'revision', 'actualizado', 'ordenes': {orden: [tarjetas]}, 'por_id', 'categorias': [{nombre, slug}]}; se sustituye de una vez
+        self._datos = None
+        self._comprobado = 0
+        self._lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        # Funciones a ejecutar (en el hilo) tras cada reconstrucción, p. ej. precalentar cachés
+        self.al_actualizar = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.intervalo = app.config.setdefault('CATALOGO_INTERVALO', 5)
+
+    @staticmethod
+    def _tarjeta(planta):
+        tarjeta = {campo: planta.get(campo) for campo in CAMPOS_TARJETA}
+        tarjeta['id'] = str(planta['_id'])
+        tarjeta['precio'] = float(tarjeta['precio'] or 0)
+        tarjeta['stock'] = tarjeta['stock'] or 0
+        tarjeta['categoria'] = tarjeta['categoria'] or ''
+        tarjeta['nombre'] = tarjeta['nombre'] or ''
+        return tarjeta
+
+    def _construir(self, revision, actualizado):
+        proyeccion = {campo: 1 for campo in CAMPOS_TARJETA}
+        tarjetas = [self._tarjeta(p) for p in PlantaModel._get_collection().find(FILTRO_VENTA, proyeccion)]
+
+        por_nombre = sorted(tarjetas, key=lambda t: (normalizar(t['nombre']), t['id']))
+        # sorted es estable: a igual precio se conserva el orden por nombre
+        precio_asc = sorted(por_nombre, key=lambda t: t['precio'])
+        precio_desc = sorted(por_nombre, key=lambda t: -t['precio'])
+
+        return {
+            'revision': revision,
+            'actualizado': actualizado,
+            'ordenes': {'nombre': por_nombre, 'precio_asc': precio_asc, 'precio_desc': precio_desc},
+            'por_id': {t['id']: t for t in tarjetas},
+            'categorias': [{'nombre': c, 'slug': slug_categoria(c)}
+                           for c in sorted({t['categoria'] for t in tarjetas if t['categoria']}, key=normalizar)]
+        }
+
+    def actualizar(self, forzar=False):
+        """Reconstruye la instantánea si cambió la revisión del catálogo; devuelve True si la sustituyó"""
+        with self._lock:
+            self._comprobado = time.monotonic()
+            doc = RevisionModel.get('catalogo')
+            revision = doc['revision']
+            if not forzar and self._datos is not None and self._datos['revision'] == revision:
+                return False
+            datos = self._construir(revision, doc['actualizado'])
+            self._datos = datos
+            logger.info(f"Catálogo de la tienda reconstruido: {len(datos['ordenes']['nombre'])} plantas "
+                        f"(revisión {revision})")
+            return True
+
+    def _datos_actuales(self):
+        # Con el hilo en marcha la petición nunca consulta MongoDB; sin él (CLI, tests,
+        # proceso padre del recargador) se comprueba la revisión como mucho cada `intervalo`
+        if self._datos is None or (not self.running and time.monotonic() - self._comprobado >= self.intervalo):
+            try:
+                self.actualizar()
+            except Exception as e:
+                if self._datos is None:
+                    raise
+                logger.error(f"Error actualizando el catálogo de la tienda: {e}")
+        return self._datos
+
+    def pagina(self, orden='nombre', page=1, per_page=20):
+        """Devuelve (tarjetas de la página, total) para uno de ORDENES_CATALOGO"""
+        datos = self._datos_actuales()
+        tarjetas = datos['ordenes'].get(orden, datos['ordenes']['nombre'])
+        inicio = (max(page, 1) - 1) * per_page
+        return tarjetas[inicio:inicio + per_page], len(tarjetas)
+
+    def categorias(self):
+        return self._datos_actuales()['categorias']
+
+    def tarjeta(self, planta_id):
+        """Tarjeta (precio, stock...) de una planta a la venta, o None si no lo está"""
+        return self._datos_actuales()['por_id'].get(str(planta_id))
+
+    def revision(self):
+        """(revisión, fecha de actualización) de la instantánea que se está sirviendo"""
+        datos = self._datos_actuales()
+        return datos['revision'], datos['actualizado']
+
+    def estadisticas(self):
+        datos = self._datos
+        return {
+            'plantas': len(datos['ordenes']['nombre']) if datos else 0,
+            'categorias': len(datos['categorias']) if datos else 0,
+            'revision': datos['revision'] if datos else None,
+            'en_segundo_plano': self.running
+        }
+
+    def start(self):
+        """Comprueba la revisión cada CATALOGO_INTERVALO segundos en un hilo daemon"""
+        if self.running or not self.intervalo:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._bucle, daemon=True, name='catalogo-tienda')
+        self.thread.start()
+        logger.info("Actualización del catálogo de la tienda iniciada")
+
+    def stop(self):
+        self.running = False
+
+    def _bucle(self):
+        with self.app.app_context():
+            while self.running:
+                try:
+                    actualizado = self.actualizar()
+                except Exception as e:
+                    actualizado = False
+                    logger.error(f"Error actualizando el catálogo de la tienda: {e}")
+                if actualizado:
+                    # Cada función por separado: un fallo no impide ejecutar las demás
+                    for funcion in self.al_actualizar:
+                        try:
+                            funcion()
+                        except Exception as e:
+                            logger.error(f"Error tras actualizar el catálogo de la tienda ({funcion.__name__}): {e}")
+                time.sleep(self.intervalo)
+
+
+# Instancia global
+catalogo_tienda = CatalogoTienda()
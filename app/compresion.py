@@ -0,0 +1,225 @@
+# app/compresion.py
+import gzip
+import mimetypes
+import os
+import zlib
+import logging
+from flask import request, send_file, current_app
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MIMETYPES_COMPRIMIBLES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/csv',
+    'text/javascript', 'application/javascript', 'application/json',
+    'application/x-ndjson', 'application/xml', 'image/svg+xml'
+}
+
+# Extensiones para las que el paso de build genera hermanos .br/.gz
+EXTENSIONES_PRECOMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.html', '.txt', '.xml', '.map')
+
+
+def elegir_codificacion(disponibles=('br', 'gzip')):
+    """Elige la mejor codificación aceptada por el cliente (br > gzip)"""
+    aceptadas = request.accept_encodings
+    for codificacion in disponibles:
+        if codificacion == 'br' and brotli is None:
+            continue
+        if aceptadas.quality(codificacion) > 0:
+            return codificacion
+    return None
+
+
+def _comprimir_stream(fragmentos, codificacion, nivel, charset='utf-8'):
+    """Comprime un iterable de respuesta fragmento a fragmento.
+
+    Cada fragmento se vacía con un flush de sincronización para que el navegador
+    pueda empezar a pintar sin esperar al final de la respuesta.
+    """
+    if codificacion == 'br':
+        compresor = brotli.Compressor(quality=nivel)
+        comprimir, vaciar, terminar = compresor.process, compresor.flush, compresor.finish
+    else:
+        compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # 31 = cabecera gzip
+        comprimir = compresor.compress
+        vaciar = lambda: compresor.flush(zlib.Z_SYNC_FLUSH)
+        terminar = compresor.flush
+
+    try:
+        for fragmento in fragmentos:
+            if isinstance(fragmento, str):
+                fragmento = fragmento.encode(charset)
+            if not fragmento:
+                continue
+            datos = comprimir(fragmento) + vaciar()
+            if datos:
+                yield datos
+        yield terminar()
+    finally:
+        if hasattr(fragmentos, 'close'):
+            fragmentos.close()
+
+
+class Compresion:
+    """Negociación gzip/brotli para respuestas dinámicas y estáticos precomprimidos"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)  # bytes
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 5)
+        app.config.setdefault('COMPRESS_STREAMS', True)
+        app.config.setdefault('COMPRESS_MIMETYPES', MIMETYPES_COMPRIMIBLES)
+
+        if not app.config['COMPRESS_ENABLED']:
+            return
+
+        app.before_request(self._servir_precomprimido)
+        app.after_request(self._comprimir_respuesta)
+
+    def _servir_precomprimido(self):
+        """Sirve el hermano .br/.gz de un estático si el paso de build lo generó"""
+        if request.endpoint != 'static' or request.method not in ('GET', 'HEAD'):
+            return None
+
+        filename = (request.view_args or {}).get('filename', '')
+        if not filename.endswith(EXTENSIONES_PRECOMPRIMIBLES):
+            return None
+
+        ruta = safe_join(current_app.static_folder, filename)
+        if not ruta or not os.path.isfile(ruta):
+            return None
+
+        codificacion = elegir_codificacion()
+        if not codificacion:
+            return None
+
+        ruta_comprimida = ruta + ('.br' if codificacion == 'br' else '.gz')
+        try:
+            # Un hermano más antiguo que el original está desactualizado
+            if os.path.getmtime(ruta_comprimida) < os.path.getmtime(ruta):
+                return None
+        except OSError:
+            return None
+
+        respuesta = send_file(
+            ruta_comprimida,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            conditional=True,
+            max_age=current_app.get_send_file_max_age(filename)
+        )
+        respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+        return respuesta
+
+    def _comprimir_respuesta(self, response):
+        config = current_app.config
+
+        if (response.mimetype not in config['COMPRESS_MIMETYPES']
+                or response.status_code < 200 or response.status_code >= 300
+                or response.status_code == 204
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or 'Content-Range' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        codificacion = elegir_codificacion()
+        if not codificacion:
+            return response
+        nivel = config['COMPRESS_BR_LEVEL'] if codificacion == 'br' else config['COMPRESS_GZIP_LEVEL']
+
+        if response.is_streamed:
+            if not config['COMPRESS_STREAMS']:
+                return response
+            response.response = _comprimir_stream(response.response, codificacion, nivel)
+            response.headers.pop('Content-Length', None)
+        else:
+            datos = response.get_data()
+            if len(datos) < config['COMPRESS_MIN_SIZE']:
+                return response
+
+            if codificacion == 'br':
+                comprimidos = brotli.compress(datos, quality=nivel)
+            else:
+                comprimidos = gzip.compress(datos, compresslevel=nivel, mtime=0)
+
+            if len(comprimidos) >= len(datos):
+                return response
+            response.set_data(comprimidos)
+
+        response.headers['Content-Encoding'] = codificacion
+
+        # El cuerpo cambia según la codificación: un ETag fuerte ya no identifica los bytes
+        etag, debil = response.get_etag()
+        if etag and not debil:
+            response.set_etag(etag, weak=True)
+
+        return response
+
+
+def precomprimir_directorio(directorio, nivel_gzip=9, nivel_br=11, tamano_minimo=256, excluir=('uploads',)):
+    """Genera hermanos .gz/.br para los estáticos de texto de un directorio.
+
+    Solo regenera los archivos cuyo original es más nuevo que su hermano y
+    descarta el resultado si no es más pequeño que el original.
+    Devuelve un resumen con los bytes originales y comprimidos.
+    """
+    resumen = {'archivos': 0, 'generados': 0, 'bytes_originales': 0, 'bytes_gzip': 0, 'bytes_br': 0}
+
+    for raiz, carpetas, archivos in os.walk(directorio):
+        carpetas[:] = [c for c in carpetas if c not in excluir]
+
+        for nombre in archivos:
+            if not nombre.endswith(EXTENSIONES_PRECOMPRIMIBLES):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            tamano = os.path.getsize(ruta)
+            if tamano < tamano_minimo:
+                continue
+
+            resumen['archivos'] += 1
+            resumen['bytes_originales'] += tamano
+            mtime = os.path.getmtime(ruta)
+            datos = None
+
+            variantes = [('.gz', 'bytes_gzip', lambda d: gzip.compress(d, compresslevel=nivel_gzip, mtime=0))]
+            if brotli is not None:
+                variantes.append(('.br', 'bytes_br', lambda d: brotli.compress(d, quality=nivel_br)))
+
+            for sufijo, clave, comprimir in variantes:
+                destino = ruta + sufijo
+                if os.path.exists(destino) and os.path.getmtime(destino) >= mtime:
+                    resumen[clave] += os.path.getsize(destino)
+                    continue
+
+                if datos is None:
+                    with open(ruta, 'rb') as f:
+                        datos = f.read()
+                comprimidos = comprimir(datos)
+
+                if len(comprimidos) >= tamano:
+                    if os.path.exists(destino):
+                        os.remove(destino)
+                    continue
+
+                with open(destino, 'wb') as f:
+                    f.write(comprimidos)
+                resumen[clave] += len(comprimidos)
+                resumen['generados'] += 1
+
+    return resumen
+
+
+# Instancia global
+compresion = Compresion()
@@ -1,5 +1,3 @@
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col
 import os
 
 # ========== BLOQUE DE CONFIGURACIÓN PARA FLASK ==========
@@ -20,6 +18,10 @@ config = {
 
 # ========== BLOQUE DE CONEXIÓN SPARK ==========
 def get_spark_session():
+    # PySpark se importa aquí para que cargar la configuración de Flask no arrastre la JVM
+    from pyspark.sql import SparkSession
+    from pyspark.sql.functions import col
+
     # Tu lógica actual de Spark se mantiene intacta
     spark = SparkSession.builder \
         .appName("InvernaderoSpark") \
@@ -1,6 +1,9 @@
 from pymongo import MongoClient
 import os
 
+# Base de datos de la aplicación; MONGO_DB permite apuntar scripts a una base de pruebas
+DB_PRODUCCION = "invernadero_db"
+
 def get_db():
     client = MongoClient(os.getenv("MONGO_URI"))
-    return client.invernadero_db
\ No newline at end of file
+    return client[os.getenv("MONGO_DB", DB_PRODUCCION)]
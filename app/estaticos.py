@@ -0,0 +1,102 @@
+# app/estaticos.py
+import hashlib
+import mimetypes
+import os
+import threading
+from flask import request, current_app
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+
+UN_ANIO = 365 * 24 * 3600
+
+# ruta absoluta -> (mtime, tamaño, hash); se recalcula solo si el archivo cambia
+_hashes = {}
+_lock = threading.Lock()
+
+
+def hash_contenido(ruta):
+    """Hash corto (12 hex) del contenido de un archivo, cacheado por mtime y tamaño"""
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None
+
+    firma = (info.st_mtime_ns, info.st_size)
+    cacheado = _hashes.get(ruta)
+    if cacheado and cacheado[:2] == firma:
+        return cacheado[2]
+
+    sha256 = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(65536), b''):
+            sha256.update(bloque)
+    valor = sha256.hexdigest()[:12]
+
+    with _lock:
+        _hashes[ruta] = (*firma, valor)
+    return valor
+
+
+def _ruta_estatico(filename):
+    if not filename:
+        return None
+    ruta = safe_join(current_app.static_folder, filename)
+    return ruta if ruta and os.path.isfile(ruta) else None
+
+
+def agregar_hash_estatico(endpoint, values):
+    """url_defaults: url_for('static', filename=...) añade ?v=<hash del contenido>"""
+    if endpoint != 'static' or 'v' in values:
+        return
+    ruta = _ruta_estatico(values.get('filename'))
+    if ruta:
+        values['v'] = hash_contenido(ruta)
+
+
+def servir_via_proxy():
+    """Modo X-Accel-Redirect: el proxy (nginx) envía los bytes, no el worker de Python"""
+    if request.endpoint != 'static':
+        return None
+
+    filename = (request.view_args or {}).get('filename', '')
+    if not _ruta_estatico(filename):
+        return None
+
+    respuesta = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    respuesta.headers['X-Accel-Redirect'] = current_app.config['STATIC_ACCEL_PREFIX'].rstrip('/') + '/' + filename
+    return respuesta
+
+
+def cabeceras_inmutables(response):
+    """Caché de un año e immutable para URLs cuyo ?v= coincide con el contenido actual"""
+    if request.endpoint != 'static' or response.status_code not in (200, 304):
+        return response
+
+    version = request.args.get('v')
+    if not version:
+        return response
+
+    ruta = _ruta_estatico((request.view_args or {}).get('filename'))
+    if not ruta or hash_contenido(ruta) != version:
+        # URL con una versión antigua: se sirve el contenido actual sin cachearlo para siempre
+        return response
+
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = UN_ANIO
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    # STATIC_PROXY_MODE: None (Flask sirve los archivos), 'x-accel' (nginx) o 'x-sendfile' (Apache/lighttpd)
+    modo = app.config.setdefault('STATIC_PROXY_MODE', os.environ.get('STATIC_PROXY_MODE') or None)
+    app.config.setdefault('STATIC_ACCEL_PREFIX', '/_estaticos_internos/')
+
+    if modo == 'x-sendfile':
+        app.config['USE_X_SENDFILE'] = True
+    elif modo == 'x-accel':
+        app.before_request(servir_via_proxy)
+
+    app.url_defaults(agregar_hash_estatico)
+    app.after_request(cabeceras_inmutables)
@@ -0,0 +1,273 @@
+# app/imagenes.py
+import os
+import io
+import base64
+import hashlib
+import threading
+import logging
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from app.models import PlantaModel
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor (px) de cada derivado que se genera a partir de la imagen original
+TAMANOS_DERIVADOS = {
+    'thumb': 160,
+    'card': 400,
+    'detail': 800
+}
+
+CARPETA_DERIVADOS = 'derivados'
+
+# Lado mayor (px) del marcador borroso que se incrusta en la página mientras carga la imagen
+LADO_LQIP = 16
+
+
+def guardar_por_contenido(archivo, carpeta, extension):
+    """Guarda un FileStorage con nombre <sha256>.<ext>; si ese contenido ya existe no duplica el archivo.
+
+    Devuelve (nombre, hash, tamaño).
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=carpeta, prefix='.subida_')
+    sha256 = hashlib.sha256()
+    tamano = 0
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            for bloque in iter(lambda: archivo.stream.read(65536), b''):
+                sha256.update(bloque)
+                destino.write(bloque)
+                tamano += len(bloque)
+
+        hash_contenido = sha256.hexdigest()
+        nombre = f"{hash_contenido}.{extension}"
+        ruta = os.path.join(carpeta, nombre)
+        if os.path.exists(ruta):
+            try:
+                # Renueva el mtime: el recolector de huérfanos da un periodo de gracia por mtime
+                # y este contenido puede haberse quedado sin referencias justo antes
+                os.utime(ruta)
+                os.remove(temporal)
+            except FileNotFoundError:
+                # El recolector lo borró entre medias: vale la copia recién subida
+                os.replace(temporal, ruta)
+        else:
+            os.replace(temporal, ruta)
+        return nombre, hash_contenido, tamano
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def abrir_imagen_rgb(ruta):
+    """Abre una imagen, respeta la orientación EXIF y aplana la transparencia sobre blanco"""
+    from PIL import Image, ImageOps
+
+    img = Image.open(ruta)
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        fondo = Image.new('RGB', img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.split()[-1])
+        img = fondo
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def guardar_variante(img, destino_base, lado):
+    """Reduce una copia a `lado` px y la guarda como WebP y JPEG; devuelve (ancho, alto)"""
+    from PIL import Image
+
+    copia = img.copy()
+    copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+    copia.save(destino_base + '.webp', 'WEBP', quality=80, method=4)
+    copia.save(destino_base + '.jpg', 'JPEG', quality=82, optimize=True, progressive=True)
+    return copia.size
+
+
+def generar_lqip(img, lado=LADO_LQIP):
+    """Marcador de baja calidad: miniatura borrosa como data URI JPEG (unos cientos de bytes)"""
+    from PIL import Image, ImageFilter
+
+    copia = img.copy()
+    copia.thumbnail((lado, lado), Image.Resampling.BILINEAR)
+    copia = copia.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    copia.save(buffer, 'JPEG', quality=40, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class ProcesadorImagenes:
+    """Genera en segundo plano los derivados (thumb/card/detail) de las imágenes subidas"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('IMAGE_WORKERS', 2)
+
+    def _get_executor(self):
+        # El pool se crea en el primer encolado: los procesos CLI no levantan hilos
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config['IMAGE_WORKERS'],
+                    thread_name_prefix='imagenes'
+                )
+            return self._executor
+
+    def encolar(self, planta_id, imagen_nombre):
+        """Programa el procesado de la imagen original recién guardada de una planta"""
+        return self._get_executor().submit(self._procesar_en_contexto, str(planta_id), imagen_nombre)
+
+    def _procesar_en_contexto(self, planta_id, imagen_nombre):
+        with self.app.app_context():
+            try:
+                return self.procesar(planta_id, imagen_nombre)
+            except Exception as e:
+                logger.error(f"Error procesando imagen {imagen_nombre} de la planta {planta_id}: {e}")
+                PlantaModel.actualizar_imagen_procesada(planta_id, imagen_nombre, {'imagen_estado': 'error'})
+                return None
+
+    def procesar(self, planta_id, imagen_nombre):
+        """Crea los derivados WebP/JPEG y el marcador LQIP y los registra en el documento de la planta"""
+        carpeta = self.app.config['PLANTAS_UPLOAD_FOLDER']
+        carpeta_derivados = os.path.join(carpeta, CARPETA_DERIVADOS)
+        os.makedirs(carpeta_derivados, exist_ok=True)
+
+        img = abrir_imagen_rgb(os.path.join(carpeta, imagen_nombre))
+        base = os.path.splitext(imagen_nombre)[0]
+
+        derivados = {}
+        for nombre, lado in TAMANOS_DERIVADOS.items():
+            archivo = f"{base}_{nombre}"
+            ancho, alto = guardar_variante(img, os.path.join(carpeta_derivados, archivo), lado)
+            ruta_relativa = f'uploads/plantas/{CARPETA_DERIVADOS}/{archivo}'
+            derivados[nombre] = {
+                'webp': ruta_relativa + '.webp',
+                'jpg': ruta_relativa + '.jpg',
+                'ancho': ancho,
+                'alto': alto
+            }
+
+        # Solo se registra si la planta sigue usando esta imagen (pudo cambiar mientras tanto)
+        PlantaModel.actualizar_imagen_procesada(planta_id, imagen_nombre, {
+            'imagenes': derivados,
+            'imagen_lqip': generar_lqip(img),
+            'imagen_estado': 'lista'
+        })
+        logger.info(f"Derivados generados para {imagen_nombre}")
+        return derivados
+
+
+class CacheDiscoImagenes:
+    """Caché LRU en disco, acotada en bytes, para las variantes redimensionadas bajo demanda.
+
+    Las peticiones concurrentes de una misma variante comparten un único cálculo:
+    la primera la genera y las demás esperan su lock y leen el archivo resultante.
+    """
+
+    def __init__(self, app=None):
+        self.directorio = None
+        self.max_bytes = 0
+        self._indice = None          # nombre -> tamaño, en orden de uso (LRU al principio)
+        self._total = 0
+        self._lock = threading.Lock()
+        self._en_curso = {}          # nombre -> Lock del cálculo en marcha
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_CACHE_DIR', os.path.join(app.instance_path, 'imagenes_cache'))
+        app.config.setdefault('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        self.directorio = app.config['IMAGE_CACHE_DIR']
+        self.max_bytes = app.config['IMAGE_CACHE_MAX_BYTES']
+
+    def _cargar_indice(self):
+        """Reconstruye el índice desde disco la primera vez (orden por último acceso)"""
+        os.makedirs(self.directorio, exist_ok=True)
+        entradas = []
+        with os.scandir(self.directorio) as it:
+            for entrada in it:
+                if entrada.is_file() and not entrada.name.startswith('.'):
+                    info = entrada.stat()
+                    entradas.append((info.st_atime, entrada.name, info.st_size))
+        entradas.sort()
+        self._indice = OrderedDict((nombre, tamano) for _, nombre, tamano in entradas)
+        self._total = sum(self._indice.values())
+
+    def _registrar(self, nombre, tamano):
+        # Llamar con self._lock adquirido
+        self._total += tamano - self._indice.pop(nombre, 0)
+        self._indice[nombre] = tamano
+        while self._total > self.max_bytes and len(self._indice) > 1:
+            viejo, tamano_viejo = self._indice.popitem(last=False)
+            self._total -= tamano_viejo
+            try:
+                os.remove(os.path.join(self.directorio, viejo))
+            except OSError:
+                pass
+
+    def obtener(self, nombre, generar):
+        """Devuelve la ruta de la variante `nombre`, generándola con generar(destino) si falta"""
+        ruta = os.path.join(self.directorio, nombre)
+
+        with self._lock:
+            if self._indice is None:
+                self._cargar_indice()
+            if nombre in self._indice and os.path.exists(ruta):
+                self._indice.move_to_end(nombre)
+                return ruta
+            lock_variante = self._en_curso.setdefault(nombre, threading.Lock())
+
+        with lock_variante:
+            # Otro hilo pudo generarla mientras esperábamos
+            if not os.path.exists(ruta):
+                fd, temporal = tempfile.mkstemp(dir=self.directorio, prefix='.tmp_')
+                os.close(fd)
+                try:
+                    generar(temporal)
+                    os.replace(temporal, ruta)
+                except Exception:
+                    if os.path.exists(temporal):
+                        os.remove(temporal)
+                    raise
+
+            with self._lock:
+                self._registrar(nombre, os.path.getsize(ruta))
+                self._en_curso.pop(nombre, None)
+        return ruta
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'entradas': len(self._indice or {}),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes
+            }
+
+
+def redimensionar(origen, destino, ancho, alto, formato):
+    """Recorta al centro y escala la imagen original a exactamente ancho x alto"""
+    from PIL import Image, ImageOps
+
+    img = abrir_imagen_rgb(origen)
+    img = ImageOps.fit(img, (ancho, alto), Image.Resampling.LANCZOS)
+    if formato == 'webp':
+        img.save(destino, 'WEBP', quality=80, method=4)
+    else:
+        img.save(destino, 'JPEG', quality=82, optimize=True, progressive=True)
+
+
+# Instancias globales
+procesador_imagenes = ProcesadorImagenes()
+cache_imagenes = CacheDiscoImagenes()
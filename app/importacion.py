@@ -0,0 +1,233 @@
+# app/importacion.py
+import csv
+import io
+import json
+import unicodedata
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from app.database import get_db
+from app.models import PlantaModel, CATEGORIAS_PLANTA, ESTADOS_PLANTA, INTERVALO_RIEGO_DEFECTO, COLACION_ES, hora_local
+
+TAMANO_LOTE = 500
+MAX_ERRORES_INFORME = 1000
+
+# Columnas del CSV exportado (y aceptadas al importar)
+CAMPOS_EXPORTACION = [
+    '_id', 'nombre', 'especie', 'categoria', 'precio', 'stock',
+    'estado', 'disponible_venta', 'descripcion'
+]
+
+def _clave(texto):
+    """Minúsculas y sin acentos, para comparar categorías escritas a mano"""
+    texto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+_CATEGORIAS = {_clave(c): c for c in CATEGORIAS_PLANTA}
+
+
+def leer_filas(stream, formato):
+    """Genera (número de fila, dict) leyendo el flujo binario poco a poco (csv o ndjson)"""
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        for numero, fila in enumerate(csv.DictReader(texto), start=2):   # la 1 es la cabecera
+            yield numero, fila
+        return
+
+    for numero, linea in enumerate(texto, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield numero, {'__error__': f'JSON inválido: {e}'}
+            continue
+        yield numero, fila if isinstance(fila, dict) else {'__error__': 'Se esperaba un objeto JSON'}
+
+
+def _a_float(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    # Acepta "12,50" además de "12.50"
+    return float(str(valor).strip().replace(',', '.'))
+
+
+def _a_bool(valor):
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'x')
+
+
+def normalizar_fila(fila):
+    """Valida y convierte los tipos de una fila; devuelve (documento, lista de errores)"""
+    if '__error__' in fila:
+        return None, [fila['__error__']]
+
+    errores = []
+    doc = {}
+
+    nombre = str(fila.get('nombre') or '').strip()
+    if not nombre:
+        errores.append('nombre es obligatorio')
+    doc['nombre'] = nombre
+
+    for campo in ('especie', 'descripcion'):
+        if fila.get(campo) not in (None, ''):
+            doc[campo] = str(fila[campo]).strip()
+
+    if fila.get('precio') not in (None, ''):
+        try:
+            doc['precio'] = round(_a_float(fila['precio']), 2)
+            if doc['precio'] < 0:
+                errores.append('precio no puede ser negativo')
+        except ValueError:
+            errores.append(f"precio inválido: {fila['precio']!r}")
+
+    if fila.get('stock') not in (None, ''):
+        try:
+            stock = _a_float(fila['stock'])
+            if stock != int(stock) or stock < 0:
+                raise ValueError
+            doc['stock'] = int(stock)
+        except ValueError:
+            errores.append(f"stock debe ser un entero no negativo: {fila['stock']!r}")
+
+    if fila.get('categoria') not in (None, ''):
+        categoria = _CATEGORIAS.get(_clave(fila['categoria']))
+        if categoria:
+            doc['categoria'] = categoria
+        else:
+            errores.append(f"categoria desconocida: {fila['categoria']!r}")
+
+    if fila.get('estado') not in (None, ''):
+        estado = _clave(fila['estado'])
+        if estado in ESTADOS_PLANTA:
+            doc['estado'] = estado
+        else:
+            errores.append(f"estado inválido: {fila['estado']!r}")
+
+    if fila.get('disponible_venta') not in (None, ''):
+        doc['disponible_venta'] = _a_bool(fila['disponible_venta'])
+
+    if fila.get('_id') not in (None, ''):
+        if ObjectId.is_valid(str(fila['_id'])):
+            doc['_id'] = ObjectId(str(fila['_id']))
+        else:
+            errores.append(f"_id inválido: {fila['_id']!r}")
+
+    return doc, errores
+
+
+def _operacion(doc, usuario_id, ahora, solo_propias):
+    """UpdateOne con upsert: por _id si viene en la fila, si no por (usuario, nombre)"""
+    planta_id = doc.pop('_id', None)
+    if planta_id:
+        filtro = {'_id': planta_id}
+        if solo_propias:
+            # Un _id ajeno no coincide y su inserción falla por clave duplicada: queda como error de fila
+            filtro['usuario_id'] = usuario_id
+    else:
+        filtro = {'usuario_id': usuario_id, 'nombre': doc['nombre']}
+
+    por_defecto = {
+        'estado': 'activa',
+        'disponible_venta': False,
+        'precio': 0.0,
+        'stock': 0,
+        'categoria': '',
+        'especie': '',
+        'descripcion': '',
+        'intervalo_riego_dias': INTERVALO_RIEGO_DEFECTO
+    }
+    al_insertar = {k: v for k, v in por_defecto.items() if k not in doc}
+    # Como en el alta manual: sin riegos todavía, queda pendiente de riego desde el alta.
+    # ahora va en UTC (fecha_registro); las fechas de riego, en hora local
+    al_insertar.update({'usuario_id': usuario_id, 'fecha_registro': ahora, 'next_watering_at': hora_local(ahora)})
+
+    return UpdateOne(
+        filtro,
+        {
+            '$set': {**doc, 'fecha_actualizacion': ahora},
+            '$setOnInsert': al_insertar,
+            '$inc': {'revision': 1}
+        },
+        upsert=True,
+        # Con la colación del índice listado_usuario_nombre: "ROSA" actualiza la fila "Rosa"
+        collation=COLACION_ES
+    )
+
+
+def importar_plantas(filas, usuario_id, solo_propias=True, tamano_lote=TAMANO_LOTE):
+    """Importa las filas de leer_filas() en lotes de bulk_write; devuelve el informe por filas"""
+    usuario_id = ObjectId(usuario_id)
+    informe = {'filas': 0, 'insertadas': 0, 'actualizadas': 0, 'con_error': 0, 'errores': []}
+
+    def _anotar_error(numero, mensajes):
+        informe['con_error'] += 1
+        if len(informe['errores']) < MAX_ERRORES_INFORME:
+            informe['errores'].append({'fila': numero, 'errores': mensajes})
+
+    def _escribir(lote, numeros):
+        resultado = PlantaModel.upsert_lote(lote)
+        informe['insertadas'] += resultado.get('nUpserted', 0)
+        informe['actualizadas'] += resultado.get('nMatched', 0)
+        for error in resultado.get('writeErrors', []):
+            _anotar_error(numeros[error['index']], [error.get('errmsg', 'error de escritura')])
+
+    lote, numeros, claves = [], [], set()
+    for numero, fila in filas:
+        informe['filas'] += 1
+        doc, errores = normalizar_fila(fila)
+        if errores:
+            _anotar_error(numero, errores)
+            continue
+
+        # Dos upserts de la misma planta en un lote no ordenado podrían insertar dos veces
+        clave = doc.get('_id') or doc['nombre']
+        if clave in claves or len(lote) >= tamano_lote:
+            _escribir(lote, numeros)
+            lote, numeros, claves = [], [], set()
+
+        claves.add(clave)
+        lote.append(_operacion(doc, usuario_id, datetime.utcnow(), solo_propias))
+        numeros.append(numero)
+
+    if lote:
+        _escribir(lote, numeros)
+    return informe
+
+
+def _valor_exportado(planta, campo):
+    valor = planta.get(campo)
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    return '' if valor is None else valor
+
+
+def exportar_plantas(filtro, formato, tamano_bloque=TAMANO_LOTE):
+    """Genera la exportación en bloques de texto sin cargar toda la colección en memoria"""
+    proyeccion = {campo: 1 for campo in CAMPOS_EXPORTACION}
+    cursor = get_db().plants.find(filtro, proyeccion).sort('_id', 1).batch_size(tamano_bloque)
+
+    buffer = io.StringIO()
+    escritor = None
+    if formato == 'csv':
+        escritor = csv.writer(buffer)
+        escritor.writerow(CAMPOS_EXPORTACION)
+
+    for indice, planta in enumerate(cursor, start=1):
+        valores = [_valor_exportado(planta, campo) for campo in CAMPOS_EXPORTACION]
+        if escritor:
+            escritor.writerow(valores)
+        else:
+            buffer.write(json.dumps(dict(zip(CAMPOS_EXPORTACION, valores)), ensure_ascii=False) + '\n')
+
+        if indice % tamano_bloque == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.getvalue():
+        yield buffer.getvalue()
@@ -1,7 +1,21 @@
 # app/models.py
+import logging
+import unicodedata
+from datetime import datetime, timedelta, timezone
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument, ReplaceOne, ASCENDING, DESCENDING, TEXT
 from app.database import get_db
 
+logger = logging.getLogger(__name__)
+
+# Estados y categorías que ofrecen los formularios de plantas
+ESTADOS_PLANTA = ['activa', 'inactiva', 'enferma', 'trasplantada', 'cosechada', 'en_floracion']
+
+CATEGORIAS_PLANTA = [
+    'Interior', 'Exterior', 'Suculentas', 'Cactus', 'Aromáticas',
+    'Medicinales', 'Frutales', 'Ornamentales', 'Tropicales', 'Acuáticas'
+]
+
 class UsuarioModel:
     @staticmethod
     def _get_collection():
@@ -25,6 +39,59 @@ class UsuarioModel:
         return result.inserted_id
 
 
+# Días entre riegos para las plantas sin intervalo propio (intervalo_riego_dias)
+INTERVALO_RIEGO_DEFECTO = 3
+MS_POR_DIA = 24 * 3600 * 1000
+
+
+def hora_local(fecha_utc):
+    """datetime UTC sin zona (fecha_registro, fecha_actualizacion) -> hora local del servidor sin zona.
+
+    Las fechas de riego (fecha_riego, ultimo_riego_at, next_watering_at) van en hora local,
+    como las introduce el formulario de riego y las compara el dashboard.
+    """
+    return fecha_utc.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+# Consultas más cortas usan el prefijo del nombre en vez del índice de texto
+MIN_CARACTERES_TEXTO = 3
+
+# Comparación sin distinguir mayúsculas ni acentos; los índices del listado la comparten
+COLACION_ES = {'locale': 'es', 'strength': 1}
+
+# Claves de orden del listado de administración
+ORDENES_LISTADO = {
+    'nombre': [("nombre", ASCENDING), ("_id", ASCENDING)],
+    'recientes': [("fecha_registro", DESCENDING), ("_id", DESCENDING)],
+    'stock': [("stock", ASCENDING), ("_id", ASCENDING)],
+    'precio_asc': [("precio", ASCENDING), ("_id", ASCENDING)],
+    'precio_desc': [("precio", DESCENDING), ("_id", DESCENDING)]
+}
+
+# Campos que pinta plants/lista.html
+PROYECCION_LISTADO = {
+    "nombre": 1, "especie": 1, "categoria": 1, "descripcion": 1, "estado": 1, "stock": 1,
+    "precio": 1, "disponible_venta": 1, "fecha_registro": 1, "imagen_url": 1,
+    "imagen_path": 1, "imagen_nombre": 1, "usuario_id": 1
+}
+
+# Campos de la tarjeta de planta de la tienda (tienda/_card_planta*.html); revision y
+# fecha_actualizacion forman la clave de la caché de fragmentos (plantillas.tarjeta_planta)
+CAMPOS_TARJETA = (
+    'nombre', 'especie', 'descripcion', 'categoria', 'precio', 'stock',
+    'imagen_url', 'imagen_path', 'imagenes', 'imagen_lqip', 'revision', 'fecha_actualizacion'
+)
+
+# Plantas que se muestran y venden en la tienda
+FILTRO_VENTA = {"disponible_venta": True, "estado": "activa", "stock": {"$gt": 0}}
+
+
+def slug_categoria(categoria):
+    """'Aromáticas' -> 'aromaticas': identificador de la categoría en las URL de la tienda"""
+    texto = unicodedata.normalize('NFKD', str(categoria or '').strip().lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return '-'.join(texto.split())
+
+
 class PlantaModel:
     @staticmethod
     def _get_collection():
@@ -35,8 +102,8 @@ class PlantaModel:
         return list(PlantaModel._get_collection().find())
 
     @staticmethod
-    def get_by_id(planta_id):
-        return PlantaModel._get_collection().find_one({"_id": ObjectId(planta_id)})
+    def get_by_id(planta_id, proyeccion=None):
+        return PlantaModel._get_collection().find_one({"_id": ObjectId(planta_id)}, proyeccion)
         
     @staticmethod
     def get_by_usuario(usuario_id):
@@ -44,19 +111,282 @@ class PlantaModel:
     
     @staticmethod
     def create(data):
+        # revision/fecha_actualizacion identifican la versión del documento (cachés de fragmentos)
+        data.setdefault('revision', 1)
+        data.setdefault('fecha_actualizacion', datetime.utcnow())
         result = PlantaModel._get_collection().insert_one(data)
+        RevisionModel.incrementar('catalogo')
+        CategoriaTiendaModel.marcar([data.get('categoria')])
         return result.inserted_id
 
     @staticmethod
     def update(planta_id, update_data):
-        return PlantaModel._get_collection().update_one(
+        """Actualiza la planta y devuelve su categoría anterior ({'_id', 'categoria'}), o None si no existe"""
+        anterior = PlantaModel._get_collection().find_one_and_update(
             {"_id": ObjectId(planta_id)},
-            {"$set": update_data}
+            {
+                "$set": {**update_data, "fecha_actualizacion": datetime.utcnow()},
+                "$inc": {"revision": 1}
+            },
+            projection={"categoria": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        RevisionModel.incrementar('catalogo')
+        # La planta puede salir de una categoría y entrar en otra
+        categoria = (anterior or {}).get('categoria')
+        CategoriaTiendaModel.marcar([categoria, update_data.get('categoria', categoria)])
+        return anterior
+
+    @staticmethod
+    def upsert_lote(operaciones):
+        """bulk_write no ordenado (UpdateOne con upsert); una sola subida de revisión del catálogo"""
+        from pymongo.errors import BulkWriteError
+        try:
+            resultado = PlantaModel._get_collection().bulk_write(operaciones, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            # Con ordered=False el resto del lote se escribe igualmente
+            resultado = e.details
+        if resultado.get('nUpserted') or resultado.get('nModified'):
+            RevisionModel.incrementar('catalogo')
+            # Sin saber qué categorías tocó el lote se refrescan todas
+            CategoriaTiendaModel.marcar()
+        return resultado
+
+    @staticmethod
+    def editar_lote(cambios, usuario_id=None):
+        """Aplica ediciones de stock/precio/disponibilidad de muchas plantas en un solo bulk_write.
+
+        Cada cambio: {'id', 'stock': {'modo': 'fijar'|'sumar', 'valor'}, 'precio_porcentaje',
+        'disponible_venta'}. Con usuario_id solo se tocan plantas de ese usuario. Devuelve
+        {id: documento resultante} de las plantas que sí se modificaron.
+        """
+        from pymongo import UpdateOne
+        ahora = datetime.utcnow()
+        ids = []
+        operaciones = []
+        for cambio in cambios:
+            filtro = {"_id": ObjectId(cambio['id'])}
+            if usuario_id:
+                filtro["usuario_id"] = ObjectId(usuario_id)
+            # Actualización con pipeline: permite redondear el precio resultante con $round
+            campos = {
+                "fecha_actualizacion": ahora,
+                "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]}
+            }
+
+            stock = cambio.get('stock')
+            if stock and stock['modo'] == 'fijar':
+                campos["stock"] = {"$literal": stock['valor']}
+            elif stock and stock['modo'] == 'sumar':
+                campos["stock"] = {"$add": [{"$ifNull": ["$stock", 0]}, stock['valor']]}
+                if stock['valor'] < 0:
+                    # No dejar stock negativo: si no alcanza, la operación no coincide
+                    filtro["stock"] = {"$gte": -stock['valor']}
+
+            if cambio.get('precio_porcentaje') is not None:
+                # A 2 decimales, como la importación: sin restos como 12.100000000000001
+                factor = 1 + cambio['precio_porcentaje'] / 100.0
+                campos["precio"] = {"$round": [{"$multiply": [{"$ifNull": ["$precio", 0]}, factor]}, 2]}
+
+            if cambio.get('disponible_venta') is not None:
+                campos["disponible_venta"] = {"$literal": cambio['disponible_venta']}
+
+            ids.append(filtro["_id"])
+            # $unset: quita la marca lote_edicion que dejaban las ediciones anteriores
+            operaciones.append(UpdateOne(filtro, [{"$set": campos}, {"$unset": "lote_edicion"}]))
+
+        if not operaciones:
+            return {}
+
+        coleccion = PlantaModel._get_collection()
+        resultado = coleccion.bulk_write(operaciones, ordered=False)
+        # Las que coincidieron llevan la fecha_actualizacion de este lote (lectura por _id)
+        proyeccion = {"nombre": 1, "stock": 1, "precio": 1, "disponible_venta": 1, "categoria": 1}
+        modificadas = {
+            str(planta["_id"]): planta
+            for planta in coleccion.find({"_id": {"$in": ids}, "fecha_actualizacion": ahora}, proyeccion)
+        }
+        if resultado.modified_count:
+            RevisionModel.incrementar('catalogo')
+            CategoriaTiendaModel.marcar({p.get('categoria') for p in modificadas.values()})
+        return modificadas
+
+    @staticmethod
+    def operacion_riego(planta_id, fecha_riego):
+        """UpdateOne que avanza ultimo_riego_at/next_watering_at con un riego nuevo.
+
+        Un riego con fecha anterior al último registrado no mueve la próxima fecha.
+        """
+        from pymongo import UpdateOne
+        return UpdateOne(
+            {
+                "_id": ObjectId(planta_id),
+                "$or": [{"ultimo_riego_at": None}, {"ultimo_riego_at": {"$lte": fecha_riego}}]
+            },
+            [{"$set": {
+                "ultimo_riego_at": fecha_riego,
+                "next_watering_at": {"$add": [
+                    fecha_riego,
+                    {"$multiply": [{"$ifNull": ["$intervalo_riego_dias", INTERVALO_RIEGO_DEFECTO]}, MS_POR_DIA]}
+                ]}
+            }}]
+        )
+
+    @staticmethod
+    def registrar_riegos(riegos):
+        """Actualiza el estado de riego de varias plantas en un solo bulk_write, sin recorrer watering_logs"""
+        operaciones = [PlantaModel.operacion_riego(r['id_planta'], r['fecha_riego']) for r in riegos]
+        if operaciones:
+            return PlantaModel._get_collection().bulk_write(operaciones, ordered=False)
+        return None
+
+    @staticmethod
+    def proxima_fecha_riego(planta, intervalo=None):
+        """next_watering_at de una planta a partir de su último riego (o de su alta si nunca se regó)"""
+        intervalo = intervalo or planta.get('intervalo_riego_dias') or INTERVALO_RIEGO_DEFECTO
+        if planta.get('ultimo_riego_at'):
+            return planta['ultimo_riego_at'] + timedelta(days=intervalo)
+        # fecha_registro está en UTC; las fechas de riego, en hora local
+        if planta.get('fecha_registro'):
+            return hora_local(planta['fecha_registro'])
+        return datetime.now()
+
+    @staticmethod
+    def get_ids_para_riego(usuario_id=None, ids=None, categoria=None):
+        """_id de las plantas activas seleccionadas (ids explícitos, una categoría o todas)"""
+        filtro = {"estado": "activa"}
+        if usuario_id:
+            filtro["usuario_id"] = ObjectId(usuario_id)
+        if ids is not None:
+            filtro["_id"] = {"$in": [ObjectId(i) for i in ids]}
+        if categoria:
+            filtro["categoria"] = categoria
+        return [p["_id"] for p in PlantaModel._get_collection().find(filtro, {"_id": 1})]
+
+    @staticmethod
+    def get_riego_pendiente(hasta, usuario_id=None, limit=50):
+        """Plantas activas con next_watering_at <= hasta, las más atrasadas primero (una consulta por rango)"""
+        filtro = {"estado": "activa", "next_watering_at": {"$lte": hasta}}
+        if usuario_id:
+            filtro["usuario_id"] = ObjectId(usuario_id)
+        coleccion = PlantaModel._get_collection()
+        plantas = list(coleccion.find(
+            filtro, {"nombre": 1, "especie": 1, "next_watering_at": 1, "ultimo_riego_at": 1}
+        ).sort("next_watering_at", ASCENDING).limit(limit))
+        total = len(plantas) if len(plantas) < limit else coleccion.count_documents(filtro)
+        return plantas, total
+
+    @staticmethod
+    def filtro_listado(usuario_id=None, estado=None, categoria=None, stock_max=None,
+                       en_venta=None, prefijo=None):
+        """Filtro del listado de administración; todos los criterios son opcionales"""
+        filtro = {}
+        if usuario_id:
+            filtro["usuario_id"] = ObjectId(usuario_id)
+        if estado:
+            filtro["estado"] = estado
+        if categoria:
+            filtro["categoria"] = categoria
+        if en_venta is not None:
+            filtro["disponible_venta"] = en_venta
+        if stock_max is not None:
+            filtro["stock"] = {"$lte": stock_max}
+        if prefijo:
+            # Rango en lugar de $regex (que ignora la colación): U+FFFF ordena tras cualquier letra,
+            # así "ros" encuentra "Rosa" y "rosal" recorriendo solo ese tramo del índice
+            filtro["nombre"] = {"$gte": prefijo, "$lt": prefijo + "\uffff"}
+        return filtro
+
+    @staticmethod
+    def listar(filtro, orden='nombre', page=1, per_page=20):
+        """Una página del listado ordenada y paginada en MongoDB; devuelve (plantas, total)"""
+        coleccion = PlantaModel._get_collection()
+        total = coleccion.count_documents(filtro, collation=COLACION_ES)
+        cursor = (coleccion.find(filtro, PROYECCION_LISTADO, collation=COLACION_ES)
+                  .sort(ORDENES_LISTADO.get(orden, ORDENES_LISTADO['nombre']))
+                  .skip((page - 1) * per_page)
+                  .limit(per_page))
+        return list(cursor), total
+
+    @staticmethod
+    def crear_indices():
+        coleccion = PlantaModel._get_collection()
+        # Sustituidos por los índices listado_* (terminan en _id, como los ORDENES_LISTADO)
+        obsoletos = {
+            "usuario_nombre", "lista_usuario_nombre", "lista_usuario_estado_nombre",
+            "lista_estado_categoria_nombre", "lista_categoria_nombre", "lista_venta_stock",
+            "lista_nombre", "lista_fecha_registro", "lista_precio"
+        }
+        for nombre in obsoletos & set(coleccion.index_information()):
+            coleccion.drop_index(nombre)
+
+        # Listado de administración: igualdad (ninguna para el admin, usuario_id para el resto)
+        # -> claves de ORDENES_LISTADO, _id incluido, para que el orden salga del índice sin SORT
+        # en memoria. estado, categoría y en venta se filtran al recorrerlo; stock_max y el
+        # prefijo del nombre son rangos tras el orden. precio_desc recorre listado_precio al revés.
+        # listado_usuario_nombre es también la clave natural de la importación masiva.
+        indices_listado = {
+            f"listado_{orden}": ORDENES_LISTADO[orden]
+            for orden in ('nombre', 'recientes', 'stock', 'precio_asc')
+        }
+        indices_listado.update({
+            f"listado_usuario_{orden}": [("usuario_id", ASCENDING)] + ORDENES_LISTADO[orden]
+            for orden in ('nombre', 'recientes', 'stock', 'precio_asc')
+        })
+        # Filtro por categoría del listado (el más usado) en el orden por defecto
+        indices_listado["listado_categoria_nombre"] = [("categoria", ASCENDING)] + ORDENES_LISTADO['nombre']
+        for nombre, claves in indices_listado.items():
+            coleccion.create_index(claves, name=nombre.replace('_asc', ''), collation=COLACION_ES)
+
+        # Buscador de la tienda: un único índice de texto ponderado (v3: ignora acentos y mayúsculas)
+        coleccion.create_index(
+            [("nombre", TEXT), ("especie", TEXT), ("descripcion", TEXT)],
+            name="busqueda_texto",
+            weights={"nombre": 10, "especie": 5, "descripcion": 1},
+            default_language="spanish"
+        )
+
+        # API del catálogo (app.api): igualdad -> orden del cursor -> resto de campos devueltos,
+        # sin colación para que los campos de texto salgan del índice (consulta cubierta)
+        resto = [("stock", ASCENDING), ("nombre", ASCENDING), ("categoria", ASCENDING), ("precio", ASCENDING)]
+        for orden in ("_id", "nombre", "precio"):
+            claves = [("disponible_venta", ASCENDING), ("estado", ASCENDING), (orden, ASCENDING)]
+            if orden != "_id":
+                claves.append(("_id", ASCENDING))
+            claves += [c for c in resto if c[0] != orden]
+            coleccion.create_index(claves, name=f"api_venta_{orden.strip('_')}")
+
+        # Cambios desde la última actualización incremental de las sugerencias (app.sugerencias)
+        coleccion.create_index([("fecha_actualizacion", ASCENDING)], name="fecha_actualizacion")
+
+        # Riegos pendientes del dashboard: igualdad por estado (y usuario), rango por fecha
+        coleccion.create_index([("estado", ASCENDING), ("next_watering_at", ASCENDING)], name="riego_pendiente")
+        coleccion.create_index([("usuario_id", ASCENDING), ("estado", ASCENDING), ("next_watering_at", ASCENDING)],
+                               name="riego_pendiente_usuario")
+
+    @staticmethod
+    def actualizar_imagen_procesada(planta_id, imagen_nombre, update_data):
+        # Filtra por imagen_nombre para no pisar una imagen subida después
+        result = PlantaModel._get_collection().update_one(
+            {"_id": ObjectId(planta_id), "imagen_nombre": imagen_nombre},
+            {
+                "$set": {**update_data, "fecha_actualizacion": datetime.utcnow()},
+                "$inc": {"revision": 1}
+            }
         )
+        if result.modified_count:
+            RevisionModel.incrementar('catalogo')
+            planta = PlantaModel.get_by_id(planta_id, {"categoria": 1}) or {}
+            CategoriaTiendaModel.marcar([planta.get('categoria')])
+        return result
 
     @staticmethod
     def delete(planta_id):
-        return PlantaModel._get_collection().delete_one({"_id": ObjectId(planta_id)})
+        anterior = PlantaModel.get_by_id(planta_id, {"categoria": 1}) or {}
+        result = PlantaModel._get_collection().delete_one({"_id": ObjectId(planta_id)})
+        RevisionModel.incrementar('catalogo')
+        CategoriaTiendaModel.marcar([anterior.get('categoria')])
+        return result
 
     # === MÉTODOS PARA LA TIENDA ONLINE ===
     @staticmethod
@@ -86,22 +416,25 @@ class PlantaModel:
         return list(PlantaModel._get_collection().find(query).limit(limit))
 
     @staticmethod
-    def buscar_avanzada(query_text, precio_min, precio_max, categoria):
-        # Construcción dinámica de la consulta para el buscador de la tienda
+    def filtro_busqueda(query_text, precio_min, precio_max, categoria):
+        """Filtro del buscador de la tienda; devuelve (filtro, modo) con modo 'texto', 'prefijo' o None"""
         filtros = {
             "disponible_venta": True, 
             "estado": "activa", 
             "stock": {"$gt": 0}
         }
-        
-        if query_text:
-            # $regex permite buscar coincidencias parciales de texto (ignorando mayúsculas/minúsculas)
-            filtros["$or"] = [
-                {"nombre": {"$regex": query_text, "$options": "i"}},
-                {"especie": {"$regex": query_text, "$options": "i"}},
-                {"descripcion": {"$regex": query_text, "$options": "i"}}
-            ]
-            
+        modo = None
+
+        query_text = (query_text or '').strip()
+        if len(query_text) >= MIN_CARACTERES_TEXTO:
+            # Índice de texto ponderado (nombre > especie > descripción), en español y sin acentos
+            filtros["$text"] = {"$search": query_text, "$language": "spanish"}
+            modo = 'texto'
+        elif query_text:
+            # 1-2 letras: el índice de texto las ignora, se busca como prefijo del nombre
+            filtros["nombre"] = {"$gte": query_text, "$lt": query_text + "\uffff"}
+            modo = 'prefijo'
+
         if precio_min is not None:
             filtros.setdefault("precio", {})["$gte"] = float(precio_min)
             
@@ -110,8 +443,224 @@ class PlantaModel:
             
         if categoria:
             filtros["categoria"] = categoria
-            
-        return list(PlantaModel._get_collection().find(filtros))
+
+        return filtros, modo
+
+    @staticmethod
+    def buscar_con_facetas(query_text, precio_min, precio_max, categoria, page=1, per_page=24, tramos_precio=5):
+        """Búsqueda de la tienda y sus facetas en una sola agregación ($facet).
+
+        Devuelve {'plantas', 'total', 'categorias', 'precios'}. Cada faceta aplica los
+        filtros de las demás pero no el suyo: el recuento por categoría respeta el rango
+        de precio elegido y sigue mostrando las otras categorías.
+        """
+        base, modo = PlantaModel.filtro_busqueda(query_text, None, None, None)
+
+        filtro_precio = {}
+        if precio_min is not None:
+            filtro_precio.setdefault("precio", {})["$gte"] = float(precio_min)
+        if precio_max is not None:
+            filtro_precio.setdefault("precio", {})["$lte"] = float(precio_max)
+        filtro_categoria = {"categoria": categoria} if categoria else {}
+
+        if modo == 'texto':
+            orden = {"score": -1, "_id": 1}
+            previos = [{"$match": base}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+            opciones = {}
+        else:
+            orden = {"nombre": 1, "_id": 1}
+            previos = [{"$match": base}]
+            opciones = {"collation": COLACION_ES}
+
+        filtro_resultados = {**filtro_precio, **filtro_categoria}
+        pipeline = previos + [{"$facet": {
+            "plantas": [
+                {"$match": filtro_resultados},
+                {"$sort": orden},
+                {"$skip": (page - 1) * per_page},
+                {"$limit": per_page}
+            ],
+            "total": [{"$match": filtro_resultados}, {"$count": "n"}],
+            "categorias": [
+                {"$match": filtro_precio},
+                {"$sortByCount": "$categoria"}
+            ],
+            "precios": [
+                {"$match": {**filtro_categoria, "precio": {"$type": "number"}}},
+                {"$bucketAuto": {"groupBy": "$precio", "buckets": tramos_precio}}
+            ]
+        }}]
+
+        resultado = next(PlantaModel._get_collection().aggregate(pipeline, **opciones), {})
+        total = resultado.get("total") or [{"n": 0}]
+        return {
+            "plantas": resultado.get("plantas", []),
+            "total": total[0]["n"],
+            "categorias": [{"nombre": c["_id"], "total": c["count"]}
+                           for c in resultado.get("categorias", []) if c["_id"]],
+            "precios": [{"min": p["_id"]["min"], "max": p["_id"]["max"], "total": p["count"]}
+                        for p in resultado.get("precios", [])]
+        }
+
+
+class CategoriaTiendaModel:
+    """Vista materializada por categoría para las páginas de la tienda.
+
+    store_categories guarda un resumen por categoría (_id = slug): total y rango de
+    precios. store_category_cards guarda una tarjeta por planta a la venta con su slug,
+    así que ninguna categoría se acerca al límite de 16 MB de un documento y la página
+    es una lectura paginada por índice (slug, nombre, _id). Las escrituras de plantas solo
+    marcan como pendientes las categorías afectadas; el hilo del catálogo de la tienda
+    las recalcula con $merge (refrescar_pendientes), de modo que la escritura no espera
+    a la agregación.
+    """
+    RECLAMO_SEGUNDOS = 300
+
+    @staticmethod
+    def _get_collection():
+        return get_db().store_categories
+
+    @staticmethod
+    def _get_tarjetas():
+        return get_db().store_category_cards
+
+    @staticmethod
+    def crear_indices():
+        CategoriaTiendaModel._get_tarjetas().create_index(
+            [("slug", ASCENDING), ("nombre", ASCENDING), ("_id", ASCENDING)],
+            name="slug_nombre", collation=COLACION_ES
+        )
+
+    @staticmethod
+    def get_by_slug(slug, proyeccion=None):
+        return CategoriaTiendaModel._get_collection().find_one({"_id": slug}, proyeccion)
+
+    @staticmethod
+    def pagina(slug, page=1, per_page=24):
+        """Tarjetas de una página de la categoría, por nombre"""
+        return list(CategoriaTiendaModel._get_tarjetas()
+                    .find({"slug": slug}, collation=COLACION_ES)
+                    .sort([("nombre", ASCENDING), ("_id", ASCENDING)])
+                    .skip((max(page, 1) - 1) * per_page)
+                    .limit(per_page))
+
+    @staticmethod
+    def _pipeline_tarjetas(categoria, ahora):
+        return [
+            {"$match": {**FILTRO_VENTA, "categoria": categoria}},
+            {"$project": {
+                "slug": {"$literal": slug_categoria(categoria)},
+                "id": {"$toString": "$_id"},
+                **{campo: 1 for campo in CAMPOS_TARJETA},
+                "actualizado": {"$literal": ahora}
+            }},
+            {"$merge": {"into": "store_category_cards", "on": "_id",
+                        "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ]
+
+    @staticmethod
+    def _pipeline(categoria, ahora):
+        return [
+            {"$match": {**FILTRO_VENTA, "categoria": categoria}},
+            {"$group": {
+                "_id": slug_categoria(categoria),
+                "total": {"$sum": 1},
+                "precio_min": {"$min": "$precio"},
+                "precio_max": {"$max": "$precio"}
+            }},
+            {"$set": {"categoria": categoria, "actualizado": ahora}},
+            # merge y no replace: conserva la marca "pendiente" si llega otra escritura mientras tanto
+            {"$merge": {"into": "store_categories", "on": "_id",
+                        "whenMatched": "merge", "whenNotMatched": "insert"}}
+        ]
+
+    @staticmethod
+    def _todas():
+        # Las del formulario y las que ya no tienen plantas a la venta también
+        return (PlantaModel._get_collection().distinct("categoria", FILTRO_VENTA)
+                + CategoriaTiendaModel._get_collection().distinct("categoria") + CATEGORIAS_PLANTA)
+
+    @staticmethod
+    def marcar(categorias=None):
+        """Marca las categorías (todas si es None) para recalcularlas en segundo plano.
+
+        Forma parte de escrituras de plantas como el descuento de stock del checkout:
+        un fallo aquí se registra y no interrumpe la escritura.
+        """
+        try:
+            if categorias is None:
+                categorias = CategoriaTiendaModel._todas()
+            coleccion = CategoriaTiendaModel._get_collection()
+            for slug, categoria in {slug_categoria(c): c for c in categorias if c}.items():
+                coleccion.update_one({"_id": slug},
+                                     {"$set": {"pendiente": True}, "$setOnInsert": {"categoria": categoria}},
+                                     upsert=True)
+        except Exception as e:
+            logger.error(f"No se pudieron marcar categorías de la tienda para refrescar: {e}")
+
+    @staticmethod
+    def refrescar_pendientes():
+        """Recalcula las categorías marcadas; lo llama el hilo del catálogo de cada proceso.
+
+        Cada categoría se reclama con find_one_and_update (pendiente -> refrescando) para
+        que dos procesos no la recalculen a la vez: el borrado de tarjetas antiguas de uno
+        eliminaría las que el otro acaba de escribir con su propia marca de tiempo.
+        """
+        coleccion = CategoriaTiendaModel._get_collection()
+        hechas = []
+        while True:
+            ahora = datetime.utcnow()
+            # Un reclamo más antiguo que RECLAMO_SEGUNDOS es de un proceso que no terminó
+            doc = coleccion.find_one_and_update(
+                {"pendiente": True, "$or": [
+                    {"refrescando": None},
+                    {"refrescando": {"$lt": ahora - timedelta(seconds=CategoriaTiendaModel.RECLAMO_SEGUNDOS)}}
+                ]},
+                {"$unset": {"pendiente": ""}, "$set": {"refrescando": ahora}},
+                projection={"categoria": 1}
+            )
+            if not doc:
+                return hechas
+            try:
+                CategoriaTiendaModel._refrescar_categoria(doc['_id'], doc['categoria'], ahora)
+            except Exception:
+                coleccion.update_one({"_id": doc['_id']}, {"$set": {"pendiente": True}})
+                raise
+            finally:
+                coleccion.update_one({"_id": doc['_id']}, {"$unset": {"refrescando": ""}})
+            hechas.append(doc['categoria'])
+
+    @staticmethod
+    def refrescar(categorias=None):
+        """Recalcula las categorías indicadas (todas si es None); las que quedan sin plantas se vacían"""
+        coleccion = CategoriaTiendaModel._get_collection()
+        if categorias is None:
+            categorias = CategoriaTiendaModel._todas()
+
+        # La colación agrupa "interior" e "Interior": una pasada por slug
+        por_slug = {slug_categoria(c): c for c in categorias if c}
+        ahora = datetime.utcnow()
+        for slug, categoria in por_slug.items():
+            # Se desmarca antes de agregar: una escritura posterior vuelve a marcarla
+            coleccion.update_one({"_id": slug}, {"$unset": {"pendiente": ""}})
+            CategoriaTiendaModel._refrescar_categoria(slug, categoria, ahora)
+
+    @staticmethod
+    def _refrescar_categoria(slug, categoria, ahora):
+        coleccion_plantas = PlantaModel._get_collection()
+        coleccion = CategoriaTiendaModel._get_collection()
+        # plantas: las tarjetas que guardaba el resumen antes de store_category_cards
+        coleccion.update_one({"_id": slug}, {"$unset": {"plantas": ""}})
+        coleccion_plantas.aggregate(CategoriaTiendaModel._pipeline_tarjetas(categoria, ahora), collation=COLACION_ES)
+        # Tarjetas que no se reescribieron: la planta dejó la categoría o ya no está a la venta
+        CategoriaTiendaModel._get_tarjetas().delete_many({"slug": slug, "actualizado": {"$ne": ahora}})
+        coleccion_plantas.aggregate(CategoriaTiendaModel._pipeline(categoria, ahora), collation=COLACION_ES)
+        # Sin plantas el $group no produce documento: se deja la categoría vacía
+        if not coleccion.count_documents({"_id": slug, "actualizado": ahora}):
+            coleccion.update_one({"_id": slug}, {"$set": {
+                "categoria": categoria, "total": 0,
+                "precio_min": None, "precio_max": None, "actualizado": ahora
+            }}, upsert=True)
 
 
 class PedidoModel:
@@ -133,6 +682,49 @@ class PedidoModel:
         return result.inserted_id
 
 
+class RecomendacionModel:
+    """Plantas compradas juntas (colección recommendations), precalculadas por app.recomendaciones"""
+    @staticmethod
+    def _get_collection():
+        return get_db().recommendations
+
+    @staticmethod
+    def get_vecinos(planta_id, limit=4):
+        """Tarjetas de las plantas recomendadas que siguen a la venta, en una sola agregación ($lookup)"""
+        resultado = next(RecomendacionModel._get_collection().aggregate([
+            {"$match": {"_id": ObjectId(planta_id)}},
+            {"$lookup": {
+                "from": "plants",
+                "let": {"ids": "$vecinos.id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$in": ["$_id", "$$ids"]}, **FILTRO_VENTA}},
+                    {"$project": {campo: 1 for campo in CAMPOS_TARJETA}}
+                ],
+                "as": "plantas"
+            }}
+        ]), None)
+        if not resultado:
+            return []
+        # $lookup no conserva el orden: se reordena por puntuación
+        por_id = {p["_id"]: p for p in resultado["plantas"]}
+        return [por_id[v["id"]] for v in resultado["vecinos"] if v["id"] in por_id][:limit]
+
+    @staticmethod
+    def guardar(recomendaciones, generado):
+        """Sustituye las recomendaciones: {planta_id: [vecinos]}; borra las de plantas sin vecinos ya"""
+        coleccion = RecomendacionModel._get_collection()
+        operaciones = [
+            ReplaceOne({"_id": planta_id}, {"vecinos": vecinos, "generado": generado}, upsert=True)
+            for planta_id, vecinos in recomendaciones.items()
+        ]
+        for inicio in range(0, len(operaciones), 1000):
+            coleccion.bulk_write(operaciones[inicio:inicio + 1000], ordered=False)
+        coleccion.delete_many({"generado": {"$ne": generado}})
+        # Invalida el ETag de las fichas de producto, que muestran estas recomendaciones
+        RevisionModel.incrementar('recomendaciones')
+        return len(operaciones)
+
+
 # === NUEVOS MODELOS FALTANTES ===
 
 class RegistroRiegoModel:
@@ -143,8 +735,20 @@ class RegistroRiegoModel:
     @staticmethod
     def create(data):
         result = RegistroRiegoModel._get_collection().insert_one(data)
+        PlantaModel.registrar_riegos([data])
+        ResumenRiegoModel.acumular([data])
         return result.inserted_id
 
+    @staticmethod
+    def create_many(riegos):
+        """Riego de muchas plantas: un insert_many y un bulk_write por colección derivada"""
+        if not riegos:
+            return []
+        result = RegistroRiegoModel._get_collection().insert_many(riegos, ordered=False)
+        PlantaModel.registrar_riegos(riegos)
+        ResumenRiegoModel.acumular(riegos)
+        return result.inserted_ids
+
     @staticmethod
     def get_by_planta(planta_id, limit=5):
         # Ordenamos por fecha_riego descendente (-1) y limitamos resultados
@@ -153,6 +757,160 @@ class RegistroRiegoModel:
         ).sort("fecha_riego", -1).limit(limit))
 
 
+class ResumenRiegoModel:
+    """Totales de riego por planta y día/semana, mantenidos con $inc al registrar cada riego"""
+    PERIODOS = ('dia', 'semana')
+
+    @staticmethod
+    def _get_collection():
+        return get_db().watering_rollups
+
+    @staticmethod
+    def inicio_periodo(fecha, periodo):
+        dia = fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Semanas de lunes a domingo, igual que $dateTrunc con startOfWeek 'monday'
+        return dia - timedelta(days=dia.weekday()) if periodo == 'semana' else dia
+
+    @staticmethod
+    def operaciones(id_planta, fecha_riego, cantidad_agua):
+        """UpdateOne (upsert) del día y la semana de un riego, para agruparlos en un bulk_write"""
+        from pymongo import UpdateOne
+        return [
+            UpdateOne(
+                {"id_planta": ObjectId(id_planta), "periodo": periodo,
+                 "inicio": ResumenRiegoModel.inicio_periodo(fecha_riego, periodo)},
+                {
+                    "$inc": {"riegos": 1, "cantidad_agua": int(cantidad_agua or 0)},
+                    "$min": {"primer_riego": fecha_riego},
+                    "$max": {"ultimo_riego": fecha_riego}
+                },
+                upsert=True
+            )
+            for periodo in ResumenRiegoModel.PERIODOS
+        ]
+
+    @staticmethod
+    def acumular(riegos):
+        """Suma una lista de riegos (dicts de watering_logs) a sus resúmenes en un solo bulk_write"""
+        operaciones = []
+        for riego in riegos:
+            operaciones.extend(ResumenRiegoModel.operaciones(
+                riego['id_planta'], riego['fecha_riego'], riego.get('cantidad_agua')
+            ))
+        if operaciones:
+            ResumenRiegoModel._get_collection().bulk_write(operaciones, ordered=False)
+
+    @staticmethod
+    def get_by_planta(planta_id, periodo, desde):
+        return list(ResumenRiegoModel._get_collection().find(
+            {"id_planta": ObjectId(planta_id), "periodo": periodo, "inicio": {"$gte": desde}},
+            {"_id": 0, "inicio": 1, "riegos": 1, "cantidad_agua": 1}
+        ).sort("inicio", ASCENDING))
+
+    @staticmethod
+    def tendencia(planta_id, hoy, dias=30, semanas=12):
+        """Series diaria y semanal (litros) con huecos en cero, promedios y mayor racha sin riego"""
+        hoy = ResumenRiegoModel.inicio_periodo(hoy, 'dia')
+        desde_dia = hoy - timedelta(days=dias - 1)
+        semana_actual = ResumenRiegoModel.inicio_periodo(hoy, 'semana')
+        desde_semana = semana_actual - timedelta(weeks=semanas - 1)
+
+        por_dia = {r['inicio']: r for r in ResumenRiegoModel.get_by_planta(planta_id, 'dia', desde_dia)}
+        por_semana = {r['inicio']: r for r in ResumenRiegoModel.get_by_planta(planta_id, 'semana', desde_semana)}
+
+        serie_dias, racha, racha_max = [], 0, 0
+        for i in range(dias):
+            dia = desde_dia + timedelta(days=i)
+            resumen = por_dia.get(dia)
+            serie_dias.append({'fecha': dia.strftime('%d/%m'),
+                               'litros': round(resumen['cantidad_agua'] / 1000, 2) if resumen else 0})
+            racha = 0 if resumen else racha + 1
+            racha_max = max(racha_max, racha)
+
+        serie_semanas = []
+        for i in range(semanas):
+            semana = desde_semana + timedelta(weeks=i)
+            resumen = por_semana.get(semana)
+            serie_semanas.append({'fecha': semana.strftime('%d/%m'),
+                                  'litros': round(resumen['cantidad_agua'] / 1000, 2) if resumen else 0})
+
+        total_dias = sum(d['litros'] for d in serie_dias)
+        dias_con_riego = len(por_dia)
+        return {
+            'dias': serie_dias,
+            'semanas': serie_semanas,
+            'total_litros': round(total_dias, 2),
+            'riegos': sum(r['riegos'] for r in por_dia.values()),
+            'promedio_diario': round(total_dias / dias, 2),
+            'promedio_semanal': round(sum(s['litros'] for s in serie_semanas) / semanas, 2),
+            'promedio_por_dia_regado': round(total_dias / dias_con_riego, 2) if dias_con_riego else 0,
+            'mayor_racha_sin_riego': racha_max
+        }
+
+    @staticmethod
+    def crear_indices():
+        ResumenRiegoModel._get_collection().create_index(
+            [("id_planta", ASCENDING), ("periodo", ASCENDING), ("inicio", ASCENDING)],
+            name="planta_periodo_inicio", unique=True
+        )
+
+
+class BusquedaModel:
+    """Registro de búsquedas de la tienda (search_log) y su resumen diario (search_stats_daily)"""
+    DIAS_REGISTRO = 30
+
+    @staticmethod
+    def _get_collection():
+        return get_db().search_log
+
+    @staticmethod
+    def registrar_lote(entradas):
+        if entradas:
+            BusquedaModel._get_collection().insert_many(entradas, ordered=False)
+
+    @staticmethod
+    def agregar_dia(dia):
+        """Resume las búsquedas de un día por consulta normalizada en search_stats_daily ($merge)"""
+        inicio = dia.replace(hour=0, minute=0, second=0, microsecond=0)
+        BusquedaModel._get_collection().aggregate([
+            {"$match": {"fecha": {"$gte": inicio, "$lt": inicio + timedelta(days=1)}}},
+            {"$group": {
+                "_id": "$consulta",
+                "total": {"$sum": 1},
+                "sin_resultados": {"$sum": {"$cond": [{"$eq": ["$resultados", 0]}, 1, 0]}}
+            }},
+            {"$project": {
+                "_id": {"$concat": [inicio.strftime('%Y-%m-%d'), ":", "$_id"]},
+                "dia": inicio,
+                "consulta": "$_id",
+                "total": 1,
+                "sin_resultados": 1
+            }},
+            {"$merge": {"into": "search_stats_daily", "on": "_id",
+                        "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ], allowDiskUse=True)
+        return get_db().search_stats_daily.count_documents({"dia": inicio})
+
+    @staticmethod
+    def populares(desde, limit=20):
+        """Consultas más repetidas desde `desde` según los resúmenes diarios"""
+        return [doc["_id"] for doc in get_db().search_stats_daily.aggregate([
+            {"$match": {"dia": {"$gte": desde}}},
+            {"$group": {"_id": "$consulta", "total": {"$sum": "$total"}}},
+            {"$sort": {"total": -1, "_id": 1}},
+            {"$limit": limit}
+        ])]
+
+    @staticmethod
+    def crear_indices():
+        # El registro crudo solo hace falta hasta resumirlo: caduca solo
+        BusquedaModel._get_collection().create_index(
+            [("fecha", ASCENDING)], name="fecha_ttl",
+            expireAfterSeconds=BusquedaModel.DIAS_REGISTRO * 86400
+        )
+        get_db().search_stats_daily.create_index([("dia", ASCENDING)], name="dia")
+
+
 class HistorialModel:
     @staticmethod
     def _get_collection():
@@ -161,4 +919,52 @@ class HistorialModel:
     @staticmethod
     def create(data):
         result = HistorialModel._get_collection().insert_one(data)
-        return result.inserted_id
\ No newline at end of file
+        return result.inserted_id
+
+
+class ImagenModel:
+    """Imágenes subidas direccionadas por contenido (_id = sha256) y cuántas plantas las usan"""
+    @staticmethod
+    def _get_collection():
+        return get_db().images
+
+    @staticmethod
+    def referenciar(hash_contenido, archivo, tamano):
+        return ImagenModel._get_collection().update_one(
+            {"_id": hash_contenido},
+            {
+                "$inc": {"referencias": 1},
+                "$setOnInsert": {"archivo": archivo, "tamano": tamano, "fecha_creacion": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    def liberar(hash_contenido):
+        # Con 0 referencias el archivo queda huérfano y lo retira el recolector
+        return ImagenModel._get_collection().find_one_and_update(
+            {"_id": hash_contenido, "referencias": {"$gt": 0}},
+            {"$inc": {"referencias": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+
+class RevisionModel:
+    """Contadores de revisión por área (p. ej. 'catalogo') para validar cachés"""
+    @staticmethod
+    def _get_collection():
+        return get_db().revisions
+
+    @staticmethod
+    def get(nombre):
+        doc = RevisionModel._get_collection().find_one({"_id": nombre})
+        return doc or {"_id": nombre, "revision": 0, "actualizado": None}
+
+    @staticmethod
+    def incrementar(nombre):
+        return RevisionModel._get_collection().find_one_and_update(
+            {"_id": nombre},
+            {"$inc": {"revision": 1}, "$set": {"actualizado": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
@@ -0,0 +1,42 @@
+# app/plantillas.py
+import os
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from app.cache import CacheLRU
+from app.models import slug_categoria
+
+# HTML ya renderizado de las tarjetas de la tienda, por planta y revisión
+fragmentos_tarjetas = CacheLRU('fragmentos_tarjetas', max_entradas=2000)
+
+
+def tarjeta_planta(planta, plantilla='tienda/_card_planta.html', carga='lazy'):
+    """Renderiza la tarjeta de una planta reutilizando el HTML mientras la planta no cambie.
+
+    La clave incluye la revisión y la fecha de actualización que PlantaModel
+    mantiene en cada escritura, así que una edición invalida la tarjeta sola.
+    `carga` ('lazy' o 'eager', para la primera fila) también cambia el HTML y entra en la clave.
+    """
+    planta_id = str(planta.get('id') or planta.get('_id'))
+    fecha = planta.get('fecha_actualizacion')
+    clave = (plantilla, planta_id, planta.get('revision', 0), fecha.isoformat() if fecha else None, carga)
+
+    def _renderizar():
+        datos = dict(planta)
+        datos['id'] = planta_id
+        return Markup(render_template(plantilla, planta=datos, carga=carga))
+
+    return fragmentos_tarjetas.get_or_set(clave, _renderizar)
+
+
+def init_app(app):
+    """Caché de bytecode de Jinja en disco y helpers de fragmentos para las plantillas"""
+    # Debe configurarse antes de que se cree app.jinja_env (primer acceso)
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(cache_dir)}
+
+    fragmentos_tarjetas.max_entradas = app.config.get('FRAGMENT_CACHE_MAX', fragmentos_tarjetas.max_entradas)
+    app.add_template_global(tarjeta_planta)
+    app.add_template_filter(slug_categoria)
@@ -0,0 +1,151 @@
+# app/recolector_imagenes.py
+import os
+import shutil
+import threading
+import time
+import logging
+from app.database import get_db
+from app.imagenes import CARPETA_DERIVADOS
+
+logger = logging.getLogger(__name__)
+
+
+def archivos_referenciados():
+    """Nombres de archivo (originales y derivados) que alguna planta o imagen sigue usando"""
+    db = get_db()
+    referenciados = set()
+
+    # Cursor con proyección mínima: no se cargan los documentos completos en memoria
+    proyeccion = {'imagen_nombre': 1, 'imagen_path': 1, 'imagenes': 1, '_id': 0}
+    for planta in db.plants.find({}, proyeccion).batch_size(1000):
+        if planta.get('imagen_nombre'):
+            referenciados.add(planta['imagen_nombre'])
+        if planta.get('imagen_path'):
+            referenciados.add(os.path.basename(planta['imagen_path']))
+        for variante in (planta.get('imagenes') or {}).values():
+            for formato in ('webp', 'jpg'):
+                if variante.get(formato):
+                    referenciados.add(os.path.basename(variante[formato]))
+
+    for imagen in db.images.find({'referencias': {'$gt': 0}}, {'archivo': 1}):
+        referenciados.add(imagen['archivo'])
+    return referenciados
+
+
+class RecolectorImagenes:
+    """Retira los archivos de uploads/plantas que ya no referencia ninguna planta.
+
+    Solo toca archivos más antiguos que el periodo de gracia (así no compite con
+    una subida o un procesado en curso) y limita las operaciones por segundo
+    para no competir por disco con el tráfico.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.running = False
+        self.thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('IMAGE_GC_INTERVALO_HORAS', 24)   # 0 desactiva el barrido en segundo plano
+        app.config.setdefault('IMAGE_GC_GRACIA_HORAS', 24)
+        app.config.setdefault('IMAGE_GC_MAX_POR_SEGUNDO', 20)
+        app.config.setdefault('IMAGE_GC_CUARENTENA', True)
+        app.config.setdefault('IMAGE_GC_CARPETA_CUARENTENA',
+                              os.path.join(app.instance_path, 'cuarentena_imagenes'))
+
+    def barrer(self, dry_run=True, gracia_horas=None, max_por_segundo=None, cuarentena=None):
+        """Recorre la carpeta de subidas y devuelve un informe de lo retirado (o a retirar)"""
+        config = self.app.config
+        gracia_horas = config['IMAGE_GC_GRACIA_HORAS'] if gracia_horas is None else gracia_horas
+        max_por_segundo = max_por_segundo or config['IMAGE_GC_MAX_POR_SEGUNDO']
+        cuarentena = config['IMAGE_GC_CUARENTENA'] if cuarentena is None else cuarentena
+
+        carpeta = config['PLANTAS_UPLOAD_FOLDER']
+        limite = time.time() - gracia_horas * 3600
+        pausa = 1.0 / max_por_segundo if max_por_segundo else 0
+
+        referenciados = archivos_referenciados()
+        informe = {
+            'dry_run': dry_run,
+            'referenciados': len(referenciados),
+            'revisados': 0,
+            'huerfanos': [],
+            'bytes': 0,
+            'errores': 0
+        }
+
+        for subcarpeta in ('', CARPETA_DERIVADOS):
+            directorio = os.path.join(carpeta, subcarpeta)
+            if not os.path.isdir(directorio):
+                continue
+            with os.scandir(directorio) as it:
+                for entrada in it:
+                    if not entrada.is_file():
+                        continue
+                    informe['revisados'] += 1
+                    info = entrada.stat()
+                    if entrada.name in referenciados or info.st_mtime > limite:
+                        continue
+
+                    informe['huerfanos'].append(os.path.join(subcarpeta, entrada.name))
+                    informe['bytes'] += info.st_size
+                    if dry_run:
+                        continue
+
+                    try:
+                        self._retirar(entrada.path, os.path.join(subcarpeta, entrada.name), cuarentena)
+                    except OSError as e:
+                        informe['errores'] += 1
+                        logger.error(f"No se pudo retirar {entrada.path}: {e}")
+                    if pausa:
+                        time.sleep(pausa)
+
+        if not dry_run:
+            # Las entradas sin referencias ya no tienen archivo que proteger
+            get_db().images.delete_many({'referencias': {'$lte': 0}})
+
+        logger.info(
+            f"Recolector de imágenes{' (dry-run)' if dry_run else ''}: "
+            f"{len(informe['huerfanos'])} huérfanos, {informe['bytes'] / 1024 / 1024:.1f} MB"
+        )
+        return informe
+
+    def _retirar(self, ruta, relativa, cuarentena):
+        if not cuarentena:
+            os.remove(ruta)
+            return
+        destino = os.path.join(self.app.config['IMAGE_GC_CARPETA_CUARENTENA'], relativa)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.move(ruta, destino)
+
+    def start(self):
+        """Barrido periódico en un hilo daemon (IMAGE_GC_INTERVALO_HORAS)"""
+        if self.running or not self.app.config['IMAGE_GC_INTERVALO_HORAS']:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._bucle, daemon=True, name='recolector-imagenes')
+        self.thread.start()
+        logger.info("Recolector de imágenes huérfanas iniciado")
+
+    def stop(self):
+        self.running = False
+
+    def _bucle(self):
+        intervalo = int(self.app.config['IMAGE_GC_INTERVALO_HORAS'] * 3600)
+        with self.app.app_context():
+            while self.running:
+                try:
+                    self.barrer(dry_run=False)
+                except Exception as e:
+                    logger.error(f"Error en el recolector de imágenes: {e}")
+                for _ in range(intervalo):
+                    if not self.running:
+                        break
+                    time.sleep(1)
+
+
+# Instancia global
+recolector_imagenes = RecolectorImagenes()
@@ -0,0 +1,101 @@
+# app/recomendaciones.py
+import logging
+from datetime import datetime
+import numpy as np
+from app.models import PedidoModel, RecomendacionModel
+
+logger = logging.getLogger(__name__)
+
+TOP_VECINOS = 8
+MIN_COINCIDENCIAS = 2
+# Un pedido de N plantas genera N² pares: los pedidos mayoristas no aportan afinidad
+MAX_PLANTAS_PEDIDO = 50
+
+
+def cestas_pedidos():
+    """Plantas distintas de cada pedido no cancelado con al menos dos plantas (listas de ObjectId)"""
+    pipeline = [
+        {"$match": {"estado_pedido": {"$ne": "cancelado"}}},
+        {"$unwind": "$detalles"},
+        # El checkout guarda 'id' (texto); los pedidos migrados, 'id_planta'
+        {"$project": {"planta": {"$convert": {
+            "input": {"$ifNull": ["$detalles.id_planta", "$detalles.id"]},
+            "to": "objectId", "onError": None, "onNull": None
+        }}}},
+        {"$match": {"planta": {"$ne": None}}},
+        {"$group": {"_id": "$_id", "plantas": {"$addToSet": "$planta"}}},
+        {"$match": {"plantas.1": {"$exists": True}}},
+        {"$project": {"_id": 0, "plantas": 1}}
+    ]
+    for pedido in PedidoModel._get_collection().aggregate(pipeline, allowDiskUse=True):
+        yield pedido["plantas"]
+
+
+def calcular_coocurrencias(cestas, top_n=TOP_VECINOS, min_coincidencias=MIN_COINCIDENCIAS,
+                           max_plantas=MAX_PLANTAS_PEDIDO):
+    """Vecinos por planta según la similitud coseno de las compras conjuntas.
+
+    Construye todos los pares (a, b) de cada cesta con numpy y los cuenta como una
+    matriz dispersa en formato de coordenadas (np.unique sobre a * n + b), sin
+    materializar nunca la matriz planta x planta. Devuelve
+    {planta_id: [{'id', 'puntuacion', 'coincidencias'}]} ordenado por puntuación.
+    """
+    indices, ids, tamanos, posiciones = {}, [], [], []
+    for cesta in cestas:
+        if len(cesta) > max_plantas:
+            continue
+        for planta in cesta:
+            if planta not in indices:
+                indices[planta] = len(ids)
+                ids.append(planta)
+            posiciones.append(indices[planta])
+        tamanos.append(len(cesta))
+
+    if not tamanos:
+        return {}
+
+    n = len(ids)
+    items = np.asarray(posiciones, dtype=np.int64)
+    tamanos = np.asarray(tamanos, dtype=np.int64)
+
+    # Para cada posición, todas las posiciones de su misma cesta
+    inicio_cesta = np.repeat(np.cumsum(tamanos) - tamanos, tamanos)
+    tamano_pos = np.repeat(tamanos, tamanos)
+    pos_a = np.repeat(np.arange(len(items)), tamano_pos)
+    desplazamiento = np.arange(len(pos_a)) - np.repeat(np.cumsum(tamano_pos) - tamano_pos, tamano_pos)
+    pos_b = np.repeat(inicio_cesta, tamano_pos) + desplazamiento
+    distintos = pos_a != pos_b
+    a, b = items[pos_a[distintos]], items[pos_b[distintos]]
+
+    # Conteo disperso de pares (coordenadas fila, columna, valor)
+    claves, coincidencias = np.unique(a * n + b, return_counts=True)
+    fila, columna = claves // n, claves % n
+    frecuencia = np.bincount(items, minlength=n)
+
+    validos = coincidencias >= min_coincidencias
+    fila, columna, coincidencias = fila[validos], columna[validos], coincidencias[validos]
+    puntuacion = coincidencias / np.sqrt(frecuencia[fila] * frecuencia[columna])
+
+    # Top-N por fila: orden por (fila, -puntuación) y rango dentro de cada fila
+    orden = np.lexsort((-puntuacion, fila))
+    fila, columna = fila[orden], columna[orden]
+    puntuacion, coincidencias = puntuacion[orden], coincidencias[orden]
+    _, inicio_fila, cuenta_fila = np.unique(fila, return_index=True, return_counts=True)
+    rango = np.arange(len(fila)) - np.repeat(inicio_fila, cuenta_fila)
+    seleccion = rango < top_n
+
+    vecinos = {}
+    for f, c, p, k in zip(fila[seleccion].tolist(), columna[seleccion].tolist(),
+                          puntuacion[seleccion].tolist(), coincidencias[seleccion].tolist()):
+        vecinos.setdefault(ids[f], []).append({'id': ids[c], 'puntuacion': round(p, 4), 'coincidencias': k})
+    return vecinos
+
+
+def generar_recomendaciones(top_n=TOP_VECINOS, min_coincidencias=MIN_COINCIDENCIAS):
+    """Recalcula y guarda las recomendaciones de todas las plantas; devuelve el informe"""
+    cestas = list(cestas_pedidos())
+    vecinos = calcular_coocurrencias(cestas, top_n=top_n, min_coincidencias=min_coincidencias)
+    guardadas = RecomendacionModel.guardar(vecinos, datetime.utcnow())
+    logger.info(f"Recomendaciones: {guardadas} plantas con vecinos a partir de {len(cestas)} pedidos")
+    return {'pedidos': len(cestas), 'plantas': guardadas,
+            'pares': sum(len(v) for v in vecinos.values())}
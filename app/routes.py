@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, current_app, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, current_app, session, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user, UserMixin
 from bson.objectid import ObjectId
 from datetime import datetime, timedelta, date
@@ -11,26 +11,30 @@ from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 import platform
-import psutil
 import subprocess
 import tempfile
 import string
 import sys
 from app.database import get_db
-from app.models import RegistroRiegoModel
+from app.models import RegistroRiegoModel, ResumenRiegoModel
 import shutil
 
 tienda_bp = Blueprint('tienda', __name__)
 main_bp = Blueprint('main', __name__)
 
 
-# Si estás en Windows, importar windll para la detección de USB
-if platform.system() == 'Windows':
-    from ctypes import windll
-
 # Importamos los modelos de MongoDB que creamos en el Paso 4
 # Asegúrate de haber añadido un HistorialModel a tu models.py con una función create()
-from app.models import UsuarioModel, PlantaModel, PedidoModel, HistorialModel 
+from app.models import UsuarioModel, PlantaModel, PedidoModel, HistorialModel, RevisionModel, ImagenModel, CategoriaTiendaModel
+from app.models import RecomendacionModel
+from app.models import ESTADOS_PLANTA, CATEGORIAS_PLANTA, ORDENES_LISTADO, INTERVALO_RIEGO_DEFECTO, slug_categoria
+from app.cache import estadisticas_caches
+from app.cache_http import respuesta_condicional
+from app.imagenes import procesador_imagenes, cache_imagenes, redimensionar, guardar_por_contenido
+from app.importacion import leer_filas, importar_plantas, exportar_plantas
+from app.sugerencias import indice_sugerencias
+from app.catalogo import catalogo_tienda
+from app.busquedas import cache_busquedas
 
 # ========== ADAPTACIÓN PARA FLASK-LOGIN CON MONGODB ==========
 class UserWrapper(UserMixin):
@@ -67,6 +71,40 @@ def guardar_carrito(carrito):
     session['carrito'] = carrito
     session.modified = True
 
+# Cookie legible desde JS con el número de artículos: el contador de la cabecera no pide nada
+COOKIE_CARRITO = 'carrito_count'
+
+def resumen_carrito(carrito):
+    """Líneas y totales del carrito con el precio actual de la instantánea del catálogo.
+
+    Las plantas que ya no están a la venta no cuentan. La página del carrito, las
+    respuestas JSON y la cookie del contador usan este mismo cálculo (sin consultar MongoDB).
+    Devuelve (líneas, {'subtotal', 'iva', 'envio', 'total', 'carrito_count'}).
+    """
+    lineas = []
+    for planta_id, item in carrito.items():
+        planta = catalogo_tienda.tarjeta(planta_id)
+        if not planta:
+            continue
+        cantidad = item.get('cantidad', 0)
+        lineas.append({
+            **planta,
+            'cantidad': cantidad,
+            'precio_unitario': planta['precio'],
+            'total_item': round(planta['precio'] * cantidad, 2)
+        })
+
+    subtotal = sum(linea['total_item'] for linea in lineas)
+    envio = 5.99 if 0 < subtotal < 50 else 0
+    iva = subtotal * 0.12
+    return lineas, {
+        'subtotal': round(subtotal, 2),
+        'iva': round(iva, 2),
+        'envio': envio,
+        'total': round(subtotal + envio + iva, 2),
+        'carrito_count': sum(linea['cantidad'] for linea in lineas)
+    }
+
 def calcular_checksum(filepath):
     if not filepath or not os.path.exists(filepath):
         return None
@@ -101,6 +139,7 @@ def validar_ruta_segura(ruta):
 # ---------- USB -------------------------------------
 def detectar_usb_json():
     """Detección USB con validación estricta de permisos de escritura (Write-Test)"""
+    import psutil  # Importación diferida: solo se necesita al detectar dispositivos
     sistema = platform.system()
     resultado = {
         'conectado': False, 'ruta': None, 'espacio_libre': 0,
@@ -375,32 +414,29 @@ def allowed_image_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 def guardar_imagen(file, planta_id):
+    """Guarda el original con su hash de contenido como nombre y suma una referencia.
+
+    La misma foto subida varias veces (o usada en varias plantas) ocupa un solo
+    archivo; los derivados los genera procesador_imagenes. Devuelve (nombre, hash).
+    """
     try:
         upload_folder = current_app.config.get('PLANTAS_UPLOAD_FOLDER', 
                                              os.path.join(current_app.static_folder, 'uploads', 'plantas'))
-        os.makedirs(upload_folder, exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'jpg'
-        filename = f"planta_{planta_id}_{timestamp}.{ext}"
-        filepath = os.path.join(upload_folder, filename)
-        
-        try:
-            from PIL import Image
-            img = Image.open(file)
-            img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            img.save(filepath, 'JPEG' if ext in ['jpg', 'jpeg'] else ext.upper(), quality=85, optimize=True)
-        except:
-            file.save(filepath)
-            
-        return filename
+        if ext == 'jpeg':
+            ext = 'jpg'
+        filename, hash_contenido, tamano = guardar_por_contenido(file, upload_folder, ext)
+        ImagenModel.referenciar(hash_contenido, filename, tamano)
+        return filename, hash_contenido
     except Exception as e:
-        current_app.logger.error(f"Error guardando imagen: {e}")
+        current_app.logger.error(f"Error guardando imagen de la planta {planta_id}: {e}")
         raise
 
+def liberar_imagen(planta):
+    """Resta la referencia de la imagen subida que la planta deja de usar"""
+    if planta and planta.get('imagen_hash'):
+        ImagenModel.liberar(planta['imagen_hash'])
+
 def es_url_imagen_valida(url):
     if not url: return False
     image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg'}
@@ -412,6 +448,34 @@ def es_url_imagen_valida(url):
         if pattern in url_lower: return True
     return False
 
+@main_bp.route('/img/<planta_id>/<int:ancho>x<int:alto>.<formato>')
+def imagen_redimensionada(planta_id, ancho, alto, formato):
+    """Variante redimensionada de la imagen subida de una planta, generada en la primera petición"""
+    if ((ancho, alto) not in current_app.config['IMAGE_SIZES_PERMITIDOS']
+            or formato not in current_app.config['IMAGE_FORMATOS_PERMITIDOS']
+            or not ObjectId.is_valid(planta_id)):
+        return jsonify({'success': False, 'message': 'Tamaño o formato no permitido'}), 404
+    
+    planta = PlantaModel.get_by_id(planta_id, {'imagen_nombre': 1})
+    if not planta or not planta.get('imagen_nombre'):
+        return jsonify({'success': False, 'message': 'La planta no tiene imagen subida'}), 404
+    
+    origen = os.path.join(current_app.config['PLANTAS_UPLOAD_FOLDER'], planta['imagen_nombre'])
+    if not os.path.exists(origen):
+        return jsonify({'success': False, 'message': 'Imagen original no encontrada'}), 404
+    
+    # La clave incluye el archivo original: una imagen nueva genera variantes nuevas
+    base = os.path.splitext(planta['imagen_nombre'])[0]
+    nombre = f"{base}_{ancho}x{alto}.{formato}"
+    try:
+        ruta = cache_imagenes.obtener(nombre, lambda destino: redimensionar(origen, destino, ancho, alto, formato))
+    except Exception as e:
+        current_app.logger.error(f"Error redimensionando {planta['imagen_nombre']}: {e}")
+        return jsonify({'success': False, 'message': 'No se pudo procesar la imagen'}), 500
+    
+    return send_file(ruta, mimetype='image/webp' if formato == 'webp' else 'image/jpeg',
+                     conditional=True, max_age=86400)
+
 # ========== PLANTAS ROUTES ==========
 # ========== PLANTAS ROUTES ==========
 @plants_bp.route('/')
@@ -421,21 +485,27 @@ def listar_plantas():
         flash('Acceso no autorizado', 'danger')
         return redirect(url_for('tienda.tienda_index'))
     
-    # 1. Obtener la lista completa de plantas según el rol
-    if current_user.rol == 'admin':
-        plantas_raw = PlantaModel.get_all()
-    else:
-        plantas_raw = PlantaModel.get_by_usuario(current_user.id)
+    # 1. Filtros de la URL; el filtrado, el orden y la paginación los resuelve MongoDB
+    filtros = {
+        'estado': request.args.get('estado') if request.args.get('estado') in ESTADOS_PLANTA else None,
+        'categoria': request.args.get('categoria') if request.args.get('categoria') in CATEGORIAS_PLANTA else None,
+        'stock_max': request.args.get('stock_max', type=int),
+        'en_venta': {'1': True, '0': False}.get(request.args.get('en_venta')),
+        'prefijo': request.args.get('q', '').strip()[:50] or None
+    }
+    orden = request.args.get('orden', 'nombre')
+    if orden not in ORDENES_LISTADO:
+        orden = 'nombre'
+    
+    usuario_id = None if current_user.rol == 'admin' else current_user.id
+    filtro = PlantaModel.filtro_listado(usuario_id=usuario_id, **filtros)
     
     # 2. Configuración de Paginación
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     per_page = 20  # Número de plantas por página
-    total = len(plantas_raw)
     
-    # 3. Lógica de Segmentación (Slicing)
-    start = (page - 1) * per_page
-    end = start + per_page
-    plantas_paginadas = plantas_raw[start:end]
+    # 3. Solo la página pedida viaja desde la base de datos
+    plantas_paginadas, total = PlantaModel.listar(filtro, orden, page, per_page)
     
     # 4. Cálculo de número de páginas
     total_pages = (total // per_page) + (1 if total % per_page > 0 else 0)
@@ -455,7 +525,11 @@ def listar_plantas():
     # IMPORTANTE: Enviamos 'plantas_paginadas' en lugar de 'plantas_raw'
     return render_template('plants/lista.html', 
                            plantas=plantas_paginadas, 
-                           pagination=pagination)
+                           pagination=pagination,
+                           filtros={k: v for k, v in request.args.items() if k != 'page'},
+                           orden=orden,
+                           estados=ESTADOS_PLANTA,
+                           categorias=CATEGORIAS_PLANTA)
 
 @plants_bp.route('/crear', methods=['GET', 'POST'])
 @login_required
@@ -482,7 +556,10 @@ def crear_planta():
                 'estado': 'activa',
                 'usuario_id': ObjectId(current_user.id),
                 'disponible_venta': False,
-                'fecha_registro': datetime.utcnow()
+                'fecha_registro': datetime.utcnow(),
+                'intervalo_riego_dias': max(request.form.get('intervalo_riego_dias', INTERVALO_RIEGO_DEFECTO, type=int), 1),
+                # Sin riegos registrados todavía: queda pendiente desde el alta (hora local, como los riegos)
+                'next_watering_at': datetime.now()
             }
             
             PlantaModel.create(nueva_planta)
@@ -495,6 +572,127 @@ def crear_planta():
     
     return render_template('plants/crear.html')
 
+@plants_bp.route('/edicion-masiva', methods=['POST'])
+@login_required
+def edicion_masiva():
+    """Edición en lote de stock (fijar o sumar), precio (porcentaje) y disponibilidad en tienda"""
+    if current_user.rol == 'cliente':
+        return jsonify({'success': False, 'message': 'Acceso no autorizado'}), 403
+    
+    datos = request.get_json(silent=True) or {}
+    cambios = datos.get('cambios')
+    if not isinstance(cambios, list) or not cambios:
+        return jsonify({'success': False, 'message': 'No se recibieron cambios'}), 400
+    if len(cambios) > 1000:
+        return jsonify({'success': False, 'message': 'Máximo 1000 plantas por lote'}), 400
+    
+    validos, resultados = [], []
+    for cambio in cambios:
+        cambio = cambio if isinstance(cambio, dict) else {}
+        planta_id = str(cambio.get('id', ''))
+        try:
+            if not ObjectId.is_valid(planta_id):
+                raise ValueError('id inválido')
+            normalizado = {'id': planta_id}
+            if cambio.get('stock') is not None:
+                modo = cambio['stock'].get('modo')
+                valor = int(cambio['stock'].get('valor'))
+                if modo not in ('fijar', 'sumar') or (modo == 'fijar' and valor < 0):
+                    raise ValueError('cambio de stock inválido')
+                normalizado['stock'] = {'modo': modo, 'valor': valor}
+            if cambio.get('precio_porcentaje') not in (None, ''):
+                porcentaje = float(cambio['precio_porcentaje'])
+                if porcentaje <= -100:
+                    raise ValueError('el precio no puede bajar un 100% o más')
+                normalizado['precio_porcentaje'] = porcentaje
+            if cambio.get('disponible_venta') is not None:
+                normalizado['disponible_venta'] = bool(cambio['disponible_venta'])
+            if len(normalizado) == 1:
+                raise ValueError('sin cambios que aplicar')
+            validos.append(normalizado)
+            resultados.append({'id': planta_id, 'success': None})
+        except (ValueError, TypeError, AttributeError) as e:
+            resultados.append({'id': planta_id, 'success': False, 'message': str(e)})
+    
+    try:
+        usuario_id = None if current_user.rol == 'admin' else current_user.id
+        modificadas = PlantaModel.editar_lote(validos, usuario_id)
+    except Exception as e:
+        current_app.logger.error(f"Error en edición masiva: {e}")
+        return jsonify({'success': False, 'message': f'Error al actualizar: {str(e)}'}), 500
+    
+    for resultado in resultados:
+        if resultado['success'] is not None:
+            continue
+        planta = modificadas.get(resultado['id'])
+        if planta:
+            resultado.update({
+                'success': True,
+                'nombre': planta.get('nombre'),
+                'stock': planta.get('stock'),
+                'precio': round(planta.get('precio') or 0, 2),
+                'disponible_venta': planta.get('disponible_venta', False)
+            })
+        else:
+            resultado.update({'success': False, 'message': 'No encontrada, sin permiso o stock insuficiente'})
+    
+    aplicados = sum(1 for r in resultados if r['success'])
+    return jsonify({
+        'success': aplicados == len(resultados),
+        'aplicados': aplicados,
+        'resultados': resultados
+    })
+
+@plants_bp.route('/importar', methods=['POST'])
+@login_required
+def importar_plantas_masivo():
+    """Importación masiva en CSV o NDJSON: archivo 'archivo' en multipart o el cuerpo tal cual"""
+    if current_user.rol == 'cliente':
+        return jsonify({'success': False, 'message': 'Acceso no autorizado'}), 403
+    
+    archivo = request.files.get('archivo')
+    if archivo and archivo.filename:
+        stream, nombre, tipo = archivo.stream, archivo.filename.lower(), archivo.mimetype
+    else:
+        # Cuerpo sin multipart: se lee directamente del socket, sin guardarlo entero
+        stream, nombre, tipo = request.stream, '', request.mimetype
+    
+    formato = request.args.get('formato')
+    if not formato:
+        formato = 'ndjson' if nombre.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (tipo or '') else 'csv'
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'Formato no soportado (csv o ndjson)'}), 400
+    
+    try:
+        informe = importar_plantas(leer_filas(stream, formato), current_user.id,
+                                   solo_propias=current_user.rol != 'admin')
+    except Exception as e:
+        current_app.logger.error(f"Error en importación masiva: {e}")
+        return jsonify({'success': False, 'message': f'Error en la importación: {str(e)}'}), 500
+    
+    return jsonify({'success': informe['con_error'] == 0, 'informe': informe})
+
+@plants_bp.route('/exportar')
+@login_required
+def exportar_plantas_masivo():
+    """Exportación en CSV o NDJSON enviada por bloques (chunked) a medida que se lee el cursor"""
+    if current_user.rol == 'cliente':
+        return jsonify({'success': False, 'message': 'Acceso no autorizado'}), 403
+    
+    formato = request.args.get('formato', 'csv')
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': 'Formato no soportado (csv o ndjson)'}), 400
+    
+    filtro = {} if current_user.rol == 'admin' else {'usuario_id': ObjectId(current_user.id)}
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    nombre = f"plantas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    
+    return Response(
+        stream_with_context(exportar_plantas(filtro, formato)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={nombre}'}
+    )
+
 # MONGODB: Cambiamos <int:id> por <id> para aceptar ObjectIds (strings)
 @plants_bp.route('/<id>')
 @login_required
@@ -519,7 +717,10 @@ def detalle_planta(id):
         flash('No tienes permiso para ver esta planta', 'danger')
         return redirect(url_for('plants.listar_plantas'))
     
-    return render_template('plants/detalle.html', planta=planta, now=datetime.utcnow())
+    # La tendencia sale de los resúmenes diarios/semanales, no de watering_logs
+    tendencia_riego = ResumenRiegoModel.tendencia(id, datetime.now())
+    return render_template('plants/detalle.html', planta=planta, now=datetime.utcnow(),
+                           tendencia_riego=tendencia_riego)
 
 @plants_bp.route('/<id>/editar', methods=['GET', 'POST'])
 @login_required
@@ -547,6 +748,11 @@ def editar_planta(id):
                 'disponible_venta': bool(request.form.get('disponible_venta', False))
             }
             
+            intervalo = request.form.get('intervalo_riego_dias', type=int)
+            if intervalo and intervalo > 0 and intervalo != planta.get('intervalo_riego_dias'):
+                update_data['intervalo_riego_dias'] = intervalo
+                update_data['next_watering_at'] = PlantaModel.proxima_fecha_riego(planta, intervalo)
+            
             imagen_file = request.files.get('imagen')
             imagen_url = request.form.get('imagen_url', '').strip()
             eliminar_imagen = request.form.get('eliminar_imagen') == 'true'
@@ -554,15 +760,29 @@ def editar_planta(id):
             if eliminar_imagen:
                 update_data['imagen_url'] = None
                 update_data['imagen_nombre'] = None
+                update_data['imagen_hash'] = None
                 update_data['imagen_path'] = None
+                update_data['imagenes'] = None
+                update_data['imagen_lqip'] = None
             elif imagen_file and imagen_file.filename and allowed_image_file(imagen_file.filename):
-                filename = guardar_imagen(imagen_file, id)
+                filename, hash_contenido = guardar_imagen(imagen_file, id)
                 update_data['imagen_nombre'] = filename
+                update_data['imagen_hash'] = hash_contenido
                 update_data['imagen_path'] = f'uploads/plantas/{filename}'
+                # La imagen subida reemplaza a la URL externa; los derivados llegan después
+                update_data['imagen_url'] = None
+                update_data['imagenes'] = None
+                update_data['imagen_lqip'] = None
+                update_data['imagen_estado'] = 'pendiente'
             elif imagen_url and es_url_imagen_valida(imagen_url):
                 update_data['imagen_url'] = imagen_url
             
             PlantaModel.update(id, update_data)
+            
+            if 'imagen_hash' in update_data:
+                liberar_imagen(planta)
+            if update_data.get('imagen_estado') == 'pendiente':
+                procesador_imagenes.encolar(id, update_data['imagen_nombre'])
             flash(f'Planta actualizada correctamente', 'success')
             return redirect(url_for('plants.detalle_planta', id=id))
             
@@ -575,7 +795,9 @@ def editar_planta(id):
 @login_required
 def eliminar_planta(id):
     if current_user.rol == 'cliente': return redirect(url_for('tienda.tienda_index'))
+    planta = PlantaModel.get_by_id(id, {'imagen_hash': 1})
     PlantaModel.delete(id)
+    liberar_imagen(planta)
     flash(f'Planta eliminada correctamente', 'success')
     return redirect(url_for('plants.listar_plantas'))
 
@@ -611,6 +833,70 @@ def guardar_riego():
         flash(f'Error al registrar el riego: {str(e)}', 'error')
         return redirect(url_for('plants.mostrar_formulario_riego', id=id_planta))
 
+@plants_bp.route('/riego-masivo', methods=['GET', 'POST'])
+@login_required
+def riego_masivo():
+    """Registra el mismo riego en muchas plantas: ids concretos, una categoría o todas las activas"""
+    if current_user.rol == 'cliente':
+        return redirect(url_for('tienda.tienda_index'))
+    
+    es_api = request.is_json
+    usuario_id = None if current_user.rol == 'admin' else current_user.id
+    
+    if request.method == 'GET':
+        plantas = PlantaModel.listar(PlantaModel.filtro_listado(usuario_id=usuario_id, estado='activa'),
+                                     per_page=500)[0]
+        return render_template('plants/riego_masivo.html', plantas=plantas, categorias=CATEGORIAS_PLANTA,
+                               today=datetime.now().strftime('%Y-%m-%d'), now=datetime.now())
+    
+    datos = request.get_json(silent=True) if es_api else request.form
+    datos = datos or {}
+    try:
+        seleccion = datos.get('seleccion', 'ids')
+        if seleccion == 'ids':
+            ids = datos.get('ids') if es_api else request.form.getlist('ids')
+            ids = [i for i in (ids or []) if ObjectId.is_valid(str(i))]
+            if not ids:
+                raise ValueError('Selecciona al menos una planta')
+            plantas_ids = PlantaModel.get_ids_para_riego(usuario_id, ids=ids)
+        elif seleccion == 'categoria':
+            if datos.get('categoria') not in CATEGORIAS_PLANTA:
+                raise ValueError('Categoría no válida')
+            plantas_ids = PlantaModel.get_ids_para_riego(usuario_id, categoria=datos['categoria'])
+        elif seleccion == 'todas':
+            # Un admin puede regar todas las plantas activas de otro usuario
+            propietario = datos.get('usuario_id') if current_user.rol == 'admin' else None
+            if propietario and not ObjectId.is_valid(str(propietario)):
+                raise ValueError('Usuario no válido')
+            plantas_ids = PlantaModel.get_ids_para_riego(propietario or current_user.id)
+        else:
+            raise ValueError('Selección no válida')
+        
+        fecha_riego = datetime.strptime(f"{datos.get('fecha_riego')} {datos.get('hora_riego')}", '%Y-%m-%d %H:%M')
+        cantidad_agua = int(datos.get('cantidad_agua'))
+        if cantidad_agua <= 0:
+            raise ValueError('La cantidad de agua debe ser mayor a 0')
+        
+        riegos = [{
+            'id_planta': planta_id,
+            'fecha_riego': fecha_riego,
+            'cantidad_agua': cantidad_agua,
+            'tipo_riego': datos.get('tipo_riego'),
+            'notas': (datos.get('notas') or '').strip()
+        } for planta_id in plantas_ids]
+        RegistroRiegoModel.create_many(riegos)
+    except (ValueError, TypeError) as e:
+        if es_api:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        flash(f'Error al registrar los riegos: {str(e)}', 'error')
+        return redirect(url_for('plants.riego_masivo'))
+    
+    mensaje = f'Riego registrado en {len(riegos)} plantas'
+    if es_api:
+        return jsonify({'success': True, 'message': mensaje, 'plantas': [str(r['id_planta']) for r in riegos]})
+    flash(mensaje, 'success' if riegos else 'warning')
+    return redirect(url_for('main.dashboard'))
+
 # ========== GESTIÓN TIENDA (ADMIN) ==========
 @plants_bp.route('/<id>/agregar-tienda', methods=['POST'])
 @login_required
@@ -681,8 +967,27 @@ def actualizar_tienda(id):
 
 # ========== TIENDA ONLINE (CLIENTES) ==========
 
+def validadores_catalogo(*args, **kwargs):
+    """Revisión del catálogo: cambia con cada alta, edición o baja de una planta"""
+    revision = RevisionModel.get('catalogo')
+    return (revision['revision'], revision['actualizado']), revision['actualizado']
+
+def validadores_ficha_planta(*args, **kwargs):
+    """Revisión del catálogo y de las recomendaciones ("también compraron") de la ficha"""
+    catalogo = RevisionModel.get('catalogo')
+    recomendaciones = RevisionModel.get('recomendaciones')
+    fechas = [f for f in (catalogo['actualizado'], recomendaciones['actualizado']) if f]
+    return ((catalogo['revision'], catalogo['actualizado'], recomendaciones['revision']),
+            max(fechas) if fechas else None)
+
+def validadores_instantanea_catalogo(*args, **kwargs):
+    """Revisión de la instantánea en memoria que se va a servir (sin consultar MongoDB)"""
+    revision, actualizado = catalogo_tienda.revision()
+    return (revision, actualizado), actualizado
+
 @tienda_bp.route('/')
 @login_required
+@respuesta_condicional(validadores_instantanea_catalogo)
 def tienda_index():
     if current_user.rol != 'cliente': 
         return redirect(url_for('main.dashboard'))
@@ -692,33 +997,11 @@ def tienda_index():
     per_page = 20  # Número de productos por página
     orden = request.args.get('orden', 'nombre')
     
-    # Obtener datos base
-    plantas_raw = PlantaModel.get_disponibles() 
-    categorias = PlantaModel.get_categorias_disponibles()
-
-    # Lógica de ordenamiento (mantenemos la tuya)
-    if orden == 'precio_asc':
-        plantas_raw.sort(key=lambda x: float(x.get('precio', 0)))
-    elif orden == 'precio_desc':
-        plantas_raw.sort(key=lambda x: float(x.get('precio', 0)), reverse=True)
-    else:
-        plantas_raw.sort(key=lambda x: x.get('nombre', '').lower())
-
-    # --- LÓGICA DE SEGMENTACIÓN ---
-    total = len(plantas_raw)
+    # Instantánea en memoria, ya ordenada: la página es un recorte, sin consultar MongoDB
+    plantas, total = catalogo_tienda.pagina(orden, page, per_page)
+    categorias = catalogo_tienda.categorias()
     total_pages = (total // per_page) + (1 if total % per_page > 0 else 0)
-    
-    start = (page - 1) * per_page
-    end = start + per_page
-    plantas_paginadas = plantas_raw[start:end]
 
-    # Formatear para el template
-    plantas = []
-    for p in plantas_paginadas:
-        p_dict = dict(p)
-        p_dict['id'] = str(p['_id'])
-        plantas.append(p_dict)
-    
     # CREAR EL DICCIONARIO QUE EL HTML ESTÁ BUSCANDO
     pagination = {
         'page': page,
@@ -741,27 +1024,114 @@ def tienda_index():
 
 @tienda_bp.route('/planta/<id>')
 @login_required
+@respuesta_condicional(validadores_ficha_planta)
 def ver_planta_tienda(id):
     planta = PlantaModel.get_by_id(id)
     if not planta:
         flash('Planta no encontrada', 'warning')
         return redirect(url_for('tienda.tienda_index'))
-    plantas_relacionadas = PlantaModel.get_by_categoria(planta.get('categoria'), exclude_id=id, limit=4)
+    # Comprados juntos (precalculado por scripts/generar_recomendaciones.py); los huecos, de la categoría
+    plantas_relacionadas = RecomendacionModel.get_vecinos(id, limit=4)
+    if len(plantas_relacionadas) < 4:
+        ya_incluidas = {p['_id'] for p in plantas_relacionadas}
+        candidatas = PlantaModel.get_by_categoria(planta.get('categoria'), exclude_id=id, limit=4 + len(ya_incluidas))
+        plantas_relacionadas += [p for p in candidatas if p['_id'] not in ya_incluidas][:4 - len(plantas_relacionadas)]
     return render_template('tienda/detalle_planta.html', planta=planta, plantas_relacionadas=plantas_relacionadas)
 
+def validadores_categoria(slug):
+    """Fecha en que se materializó la categoría: se recalcula en segundo plano, después de la revisión"""
+    vista = CategoriaTiendaModel.get_by_slug(slug, {"actualizado": 1}) or {}
+    return ('categoria', slug, vista.get('actualizado')), vista.get('actualizado')
+
+@tienda_bp.route('/categoria/<slug>')
+@login_required
+@respuesta_condicional(validadores_categoria)
+def ver_categoria(slug):
+    # Una lectura por _id de la vista materializada (store_categories)
+    vista = CategoriaTiendaModel.get_by_slug(slug)
+    # Solo con la marca de pendiente todavía no se ha materializado nunca
+    if not vista or 'total' not in vista:
+        nombres = {slug_categoria(c): c for c in CATEGORIAS_PLANTA}
+        categoria = (vista or {}).get('categoria') or nombres.get(slug)
+        if not categoria:
+            flash('Categoría no encontrada', 'warning')
+            return redirect(url_for('tienda.tienda_index'))
+        # Aún sin materializar: se calcula una vez aquí y queda guardada
+        CategoriaTiendaModel.refrescar([categoria])
+        vista = CategoriaTiendaModel.get_by_slug(slug)
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 24
+    total = vista['total']
+    total_pages = (total // per_page) + (1 if total % per_page > 0 else 0)
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': total_pages,
+        'has_prev': page > 1,
+        'has_next': page < total_pages,
+        'prev_num': page - 1,
+        'next_num': page + 1
+    }
+
+    return render_template('tienda/categoria.html',
+                         slug=slug,
+                         categoria=vista['categoria'],
+                         plantas=CategoriaTiendaModel.pagina(slug, page, per_page),
+                         pagination=pagination,
+                         total=total,
+                         precio_min=vista['precio_min'],
+                         precio_max=vista['precio_max'])
+
 @tienda_bp.route('/buscar')
 @login_required
+@respuesta_condicional(validadores_instantanea_catalogo)
 def buscar_plantas():
     query = request.args.get('q', '')
     precio_min = request.args.get('precio_min', type=float)
     precio_max = request.args.get('precio_max', type=float)
     categoria = request.args.get('categoria', '')
     
-    plantas = PlantaModel.buscar_avanzada(query, precio_min, precio_max, categoria)
-    categorias = PlantaModel.get_categorias_disponibles()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 24
+    
+    # Resultados, total y facetas en una sola agregación, cacheada por consulta normalizada y revisión
+    busqueda = cache_busquedas.buscar(query, precio_min, precio_max, categoria, page, per_page)
+    plantas, total = busqueda['plantas'], busqueda['total']
+    categorias = [c['nombre'] for c in catalogo_tienda.categorias()]
+    if page == 1:
+        cache_busquedas.registrar(query, categoria, total)
+    
+    total_pages = (total // per_page) + (1 if total % per_page > 0 else 0)
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': total_pages,
+        'has_prev': page > 1,
+        'has_next': page < total_pages,
+        'prev_num': page - 1,
+        'next_num': page + 1
+    }
     
     return render_template('tienda/buscar.html', plantas=plantas, query=query, 
-                         categorias=categorias, categoria_seleccionada=categoria)
+                         categorias=categorias, categoria_seleccionada=categoria,
+                         precio_min=precio_min, precio_max=precio_max, pagination=pagination,
+                         facetas_categoria=busqueda['categorias'], facetas_precio=busqueda['precios'],
+                         filtros={k: v for k, v in request.args.items() if k != 'page'})
+
+@tienda_bp.route('/sugerencias')
+@login_required
+def sugerencias():
+    """Autocompletado del buscador: prefijo de nombre o especie, servido desde memoria"""
+    resultados = indice_sugerencias.buscar(request.args.get('q', '')[:50])
+    for resultado in resultados:
+        resultado['url'] = url_for('tienda.ver_planta_tienda', id=resultado['id'])
+    respuesta = jsonify({'success': True, 'sugerencias': resultados})
+    respuesta.cache_control.private = True
+    respuesta.cache_control.max_age = 60
+    return respuesta
 
 @tienda_bp.route('/mi-perfil')
 @login_required
@@ -770,73 +1140,102 @@ def mi_perfil():
 
 # ========== CARRITO DE COMPRAS (Lógica Corregida y Única) ==========
 
+@tienda_bp.after_request
+def sincronizar_cookie_carrito(response):
+    """Mantiene la cookie del contador igual al carrito de la sesión (también tras el checkout)"""
+    cantidad = str(resumen_carrito(session.get('carrito', {}))[1]['carrito_count'])
+    if request.cookies.get(COOKIE_CARRITO) != cantidad:
+        response.set_cookie(COOKIE_CARRITO, cantidad, samesite='Lax', httponly=False)
+    return response
+
+def respuesta_carrito(carrito, planta_id=None):
+    """Línea modificada (None si se quitó), totales y número de artículos en una sola respuesta"""
+    lineas, totales = resumen_carrito(carrito)
+    linea = next(({campo: l[campo] for campo in ('id', 'nombre', 'cantidad', 'precio_unitario', 'total_item')}
+                  for l in lineas if l['id'] == planta_id), None)
+    return jsonify({'success': True, 'linea': linea, **totales})
+
+def _cantidad_solicitada(por_defecto=None):
+    datos = request.get_json(silent=True) or {}
+    try:
+        return int(datos.get('cantidad', request.form.get('cantidad', por_defecto)))
+    except (TypeError, ValueError):
+        return None
+
 @tienda_bp.route('/agregar-al-carrito/<id>', methods=['POST'])
 @login_required
 def agregar_al_carrito(id):
-    try:
-        planta = PlantaModel.get_by_id(id)
-        if not planta or planta.get('stock', 0) <= 0:
+    # Precio y stock de la instantánea del catálogo en memoria; el checkout vuelve a validar el stock
+    planta = catalogo_tienda.tarjeta(id)
+    cantidad = _cantidad_solicitada(1)
+    if not planta:
+        return jsonify({'success': False, 'message': 'Stock agotado'}), 400
+    if not cantidad or cantidad < 1:
+        return jsonify({'success': False, 'message': 'Cantidad inválida'}), 400
+
+    carrito = session.get('carrito', {})
+    # Se valida antes de tocar el carrito: un rechazo no deja una línea con cantidad 0
+    actual = carrito.get(id, {}).get('cantidad', 0)
+    if actual + cantidad > planta['stock']:
+        return jsonify({'success': False, 'message': f'Solo quedan {planta["stock"]} unidades'}), 400
+    item = carrito.setdefault(id, {'cantidad': 0, 'precio': planta['precio'], 'nombre': planta['nombre']})
+    item['cantidad'] = actual + cantidad
+
+    guardar_carrito(carrito)
+    return respuesta_carrito(carrito, id)
+
+@tienda_bp.route('/carrito/actualizar/<id>', methods=['POST'])
+@login_required
+def actualizar_carrito(id):
+    carrito = session.get('carrito', {})
+    if id not in carrito:
+        return jsonify({'success': False, 'message': 'La planta no está en el carrito'}), 404
+
+    cantidad = _cantidad_solicitada()
+    if cantidad is None or cantidad < 0:
+        return jsonify({'success': False, 'message': 'Cantidad inválida'}), 400
+    if cantidad == 0:
+        carrito.pop(id)
+    else:
+        planta = catalogo_tienda.tarjeta(id)
+        if not planta:
             return jsonify({'success': False, 'message': 'Stock agotado'}), 400
-        
-        carrito = session.get('carrito', {})
-        
-        if id in carrito:
-            carrito[id]['cantidad'] += 1
-        else:
-            carrito[id] = {
-                'cantidad': 1,
-                'precio': float(planta['precio']),
-                'nombre': planta['nombre']
-            }
-            
-        session['carrito'] = carrito
-        session.modified = True
-        
-        return jsonify({
-            'success': True,
-            'carrito_count': sum(item['cantidad'] for item in carrito.values())
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 500
+        if cantidad > planta['stock']:
+            return jsonify({'success': False, 'message': f'Solo quedan {planta["stock"]} unidades'}), 400
+        carrito[id]['cantidad'] = cantidad
+
+    guardar_carrito(carrito)
+    return respuesta_carrito(carrito, id)
+
+@tienda_bp.route('/carrito/eliminar/<id>', methods=['POST'])
+@login_required
+def eliminar_del_carrito(id):
+    carrito = session.get('carrito', {})
+    carrito.pop(id, None)
+    guardar_carrito(carrito)
+    return respuesta_carrito(carrito, id)
+
+@tienda_bp.route('/carrito/vaciar', methods=['POST'])
+@login_required
+def vaciar_carrito():
+    guardar_carrito({})
+    return respuesta_carrito({})
 
 @tienda_bp.route('/cantidad-carrito')
 @login_required
 def cantidad_carrito():
-    carrito = session.get('carrito', {})
-    total = sum(item.get('cantidad', 0) for item in carrito.values())
-    return jsonify({'success': True, 'total_items': total})
+    # La cabecera lee la cookie carrito_count; se mantiene para clientes de la API
+    return jsonify({'success': True, 'total_items': resumen_carrito(session.get('carrito', {}))[1]['carrito_count']})
 
 @tienda_bp.route('/carrito')
 @login_required
 def ver_carrito():
-    # Función para obtener carrito (asumiendo que está en tus utils o definida localmente)
-    carrito = session.get('carrito', {})
-    plantas_carrito = []
-    subtotal = 0.0
-    
-    for planta_id_str, item in carrito.items():
-        planta = PlantaModel.get_by_id(planta_id_str)
-        if planta and planta.get('disponible_venta') and planta.get('stock', 0) > 0:
-            precio_unitario = float(planta.get('precio', 0))
-            cantidad = item['cantidad']
-            total_item = cantidad * precio_unitario
-            
-            planta_dict = dict(planta)
-            planta_dict['id'] = str(planta['_id'])
-            planta_dict['cantidad'] = cantidad
-            planta_dict['precio_unitario'] = precio_unitario
-            planta_dict['total_item'] = total_item
-            
-            plantas_carrito.append(planta_dict)
-            subtotal += total_item
-            
-    envio = 5.99 if subtotal < 50 and subtotal > 0 else 0
-    iva = subtotal * 0.12
-    total = subtotal + envio + iva
+    # Mismo cálculo que las respuestas JSON del carrito: precio actual, sin plantas retiradas
+    plantas_carrito, totales = resumen_carrito(session.get('carrito', {}))
     
     return render_template('tienda/carrito.html', plantas_carrito=plantas_carrito, 
-                         subtotal=subtotal, envio=envio, iva=iva, total=total, 
-                         carrito_vacio=len(plantas_carrito) == 0)
+                         subtotal=totales['subtotal'], envio=totales['envio'], iva=totales['iva'],
+                         total=totales['total'], carrito_vacio=len(plantas_carrito) == 0)
 
 # ========== CHECKOUT Y PEDIDOS ==========
 
@@ -979,7 +1378,11 @@ def dashboard():
     
     db = get_db()
     total_plantas = db.plants.count_documents({})
-    plantas_activas = db.plants.count_documents({'estado': 'activa'})
+    
+    # Pendientes hasta el final de hoy (las fechas de riego se guardan en hora local)
+    inicio_hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    usuario_id = None if current_user.rol == 'admin' else current_user.id
+    plantas_por_regar, total_por_regar = PlantaModel.get_riego_pendiente(inicio_hoy + timedelta(days=1), usuario_id)
     ultimos_riegos = list(db.watering_logs.find().sort('fecha_riego', -1).limit(10))
     
     for riego in ultimos_riegos:
@@ -988,7 +1391,8 @@ def dashboard():
     
     ultimo_backup = db.backups.find_one(sort=[('fecha_respaldo', -1)])
     return render_template('dashboard.html', total_plantas=total_plantas, 
-                         plantas_riego_hoy=plantas_activas, ultimos_riegos=ultimos_riegos, 
+                         plantas_riego_hoy=total_por_regar, plantas_por_regar=plantas_por_regar,
+                         inicio_hoy=inicio_hoy, ultimos_riegos=ultimos_riegos, 
                          ultimo_backup=ultimo_backup['fecha_respaldo'] if ultimo_backup else None)
 
 @main_bp.route('/admin/pedidos')
@@ -1071,6 +1475,16 @@ def estadisticas_tienda():
                          total_pedidos=stats['total_pedidos'],
                          productos_vendidos=productos_vendidos)
 
+@main_bp.route('/admin/metricas-cache')
+@login_required
+def metricas_cache():
+    """Métricas de aciertos de las cachés en memoria de este proceso"""
+    if current_user.rol != 'admin':
+        return jsonify({'success': False, 'message': 'No autorizado'}), 403
+    return jsonify({'success': True, 'caches': estadisticas_caches(),
+                    'sugerencias': indice_sugerencias.estadisticas(),
+                    'catalogo': catalogo_tienda.estadisticas()})
+
 #--------------------------------------------------------------------
 # ========== RESPALDO Y ANALISIS ==========
 # ========== RESPALDO Y ANALISIS ==========
@@ -1279,8 +1693,37 @@ from bson import json_util # ¡Importante! Convierte ObjectIds y Fechas a JSON c
 from app.database import get_db
 
 # ========== RUTAS DE RESPALDOS ==========
+def tiempo_relativo(fecha):
+    """Texto 'Hace X ...' para la fecha del último respaldo"""
+    if not fecha:
+        return 'Nunca'
+    diff = datetime.utcnow() - fecha
+    if diff.days > 0: return f'Hace {diff.days} días'
+    elif diff.seconds >= 3600: return f'Hace {diff.seconds // 3600} horas'
+    elif diff.seconds >= 60: return f'Hace {diff.seconds // 60} minutos'
+    else: return 'Hace unos momentos'
+
+def validadores_respaldos(*args, **kwargs):
+    """Huella barata de la lista de respaldos y del estado de los dispositivos.
+    
+    Usa el conteo (metadatos), el último _id y los puntos de montaje actuales,
+    en lugar de la consulta completa y del Write-Test de detectar_usb_json().
+    """
+    import psutil
+    db = get_db()
+    ultimo = db.backups.find_one({}, {'fecha_respaldo': 1}, sort=[('_id', -1)])
+    montajes = tuple(sorted(p.mountpoint for p in psutil.disk_partitions(all=False)))
+    semilla = (
+        db.backups.estimated_document_count(),
+        ultimo['_id'] if ultimo else None,
+        tiempo_relativo(ultimo.get('fecha_respaldo') if ultimo else None),
+        montajes
+    )
+    return semilla, None
+
 @backup_bp.route('/')
 @login_required
+@respuesta_condicional(validadores_respaldos)
 def listar_respaldos():
     if current_user.rol != 'admin':
         flash('Solo administradores pueden acceder a esta sección', 'danger')
@@ -1302,14 +1745,7 @@ def listar_respaldos():
     total_copias_usb = db.backups.count_documents({'tipo_respaldo': {'$regex': '^copia_usb'}})
     total_importados = db.backups.count_documents({'tipo_respaldo': {'$regex': '^importado'}})
     
-    last_backup_time = 'Nunca'
-    if respaldos and respaldos[0].get('fecha_respaldo'):
-        # Misma lógica tuya para calcular el tiempo relativo...
-        diff = datetime.utcnow() - respaldos[0]['fecha_respaldo']
-        if diff.days > 0: last_backup_time = f'Hace {diff.days} días'
-        elif diff.seconds >= 3600: last_backup_time = f'Hace {diff.seconds // 3600} horas'
-        elif diff.seconds >= 60: last_backup_time = f'Hace {diff.seconds // 60} minutos'
-        else: last_backup_time = 'Hace unos momentos'
+    last_backup_time = tiempo_relativo(respaldos[0].get('fecha_respaldo') if respaldos else None)
     
     return render_template('backups/lista.html', 
                          respaldos=respaldos, total_completos=total_completos,
@@ -1401,6 +1837,9 @@ def restaurar_respaldo(id):
                 db[coll_name].delete_many({}) 
                 db[coll_name].insert_many(documentos)
         
+        # El catálogo restaurado es otra versión: invalida ETags y cachés por revisión
+        RevisionModel.incrementar('catalogo')
+        
         # 3. Registrar acción
         db.access_logs.insert_one({
             'usuario_id': ObjectId(current_user.id),
@@ -1532,6 +1971,8 @@ def limpiar_base_datos():
                 # Borra todos los documentos, pero mantiene la estructura
                 db[coll_name].delete_many({})
                 
+        RevisionModel.incrementar('catalogo')
+        
         # Registramos la limpieza
         db.access_logs.insert_one({
             'usuario_id': ObjectId(current_user.id),
@@ -1831,6 +2272,7 @@ def test_usb_permisos():
 def debug_usb_detection():
     if current_user.rol != 'admin': return jsonify({'success': False}), 403
     
+    import psutil
     particiones_info = []
     for part in psutil.disk_partitions(all=False):
         try:
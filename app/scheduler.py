@@ -69,8 +69,8 @@ class BackupScheduler:
         if app_instance:
             self.app = app_instance
         else:
-            from app import create_app
-            self.app = create_app()
+            from app import create_cli_app
+            self.app = create_cli_app()
         
         self.running = True
         self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
@@ -140,8 +140,9 @@ class BackupScheduler:
     def _execute_scheduled_backup(self, programacion):
         """Ejecutar un respaldo extrayendo datos con PyMongo"""
         try:
-            # Importaciones locales para evitar dependencias circulares
-            from app.routes import calcular_checksum, detectar_usb_json
+            # Importaciones locales: app.routes solo se carga si hay que detectar la USB,
+            # así el proceso del planificador no importa todas las vistas
+            from app.utils import backup_manager
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             tipo = programacion.get('tipo_respaldo', 'completo')
@@ -149,6 +150,7 @@ class BackupScheduler:
             
             # Determinar almacenamiento
             if programacion.get('almacenamiento') == 'usb':
+                from app.routes import detectar_usb_json
                 usb_info = detectar_usb_json()
                 if usb_info.get('conectado'):
                     usb_backup_folder = os.path.join(usb_info['ruta'], 'respaldos_gestion_plantas')
@@ -178,7 +180,7 @@ class BackupScheduler:
             
             # 3. REGISTRO EN BASE DE DATOS
             tamaño_mb = os.path.getsize(filepath) / (1024 * 1024)
-            checksum = calcular_checksum(filepath)
+            checksum = backup_manager.calculate_checksum(filepath)
             
             nuevo_respaldo = {
                 'tipo_respaldo': f"programado_{tipo}",
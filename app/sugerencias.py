@@ -0,0 +1,182 @@
+# app/sugerencias.py
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from bson.objectid import ObjectId
+from app.models import PlantaModel, RevisionModel, FILTRO_VENTA
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: las claves y las consultas se comparan igual"""
+    texto = unicodedata.normalize('NFKD', str(texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+class IndiceSugerencias:
+    """Autocompletado del buscador desde un arreglo ordenado en memoria (búsqueda con bisect).
+
+    Claves: cada palabra (con el resto de la frase) de nombre, especie y categoría
+    normalizados de las plantas a la venta, así "paz" o "la paz" encuentran "Lirio de
+    la paz" y "interior" las plantas de esa categoría. Con cada cambio de
+    revisión del catálogo solo se releen las plantas modificadas desde la última vez
+    (índice fecha_actualizacion); se reconstruye entero si faltan bajas que no se pueden
+    detectar así. Con la aplicación en marcha lo actualiza el hilo del catálogo de la
+    tienda (actualizar), nunca la petición; sin él (CLI, tests) la petición lo comprueba
+    como mucho cada `intervalo` segundos.
+    """
+
+    def __init__(self, app=None):
+        self.max_entradas = 50000
+        self.intervalo = 30
+        # (claves ordenadas, entradas paralelas (planta_id, nombre)); se sustituye de una vez
+        self._datos = ([], [])
+        self._ids = set()
+        # True si la última reconstrucción se cortó en max_entradas (no están todas las plantas)
+        self._truncado = False
+        self.en_segundo_plano = False
+        self._revision = None
+        self._actualizado = None
+        self._comprobado = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entradas = app.config.setdefault('SUGERENCIAS_MAX_ENTRADAS', 50000)
+        self.intervalo = app.config.setdefault('SUGERENCIAS_INTERVALO', 30)
+
+    @staticmethod
+    def _claves_planta(planta):
+        claves = set()
+        for campo in ('nombre', 'especie', 'categoria'):
+            palabras = normalizar(planta.get(campo)).split()
+            for i in range(len(palabras)):
+                claves.add(' '.join(palabras[i:])[:80])
+        return list(claves)
+
+    def _reconstruir(self, revision):
+        pares = []
+        ids = set()
+        # Antes de leer: lo escrito durante la lectura lo recoge la siguiente actualización
+        actualizado = datetime.utcnow()
+        proyeccion = {"nombre": 1, "especie": 1, "categoria": 1}
+        truncado = False
+        for planta in PlantaModel._get_collection().find(FILTRO_VENTA, proyeccion):
+            if len(pares) >= self.max_entradas:
+                logger.warning(f"Sugerencias: se alcanzó el límite de {self.max_entradas} claves")
+                truncado = True
+                break
+            for clave in self._claves_planta(planta):
+                pares.append((clave, (str(planta['_id']), planta.get('nombre', ''))))
+            ids.add(str(planta['_id']))
+        pares.sort(key=lambda par: par[0])
+
+        self._datos = ([c for c, _ in pares], [e for _, e in pares])
+        self._ids = ids
+        self._truncado = truncado
+        self._revision = revision
+        self._actualizado = actualizado
+
+    def _actualizar_cambios(self, revision):
+        """Aplica solo las plantas modificadas desde la última actualización"""
+        desde = self._actualizado
+        self._actualizado = datetime.utcnow()
+        cambiadas = list(PlantaModel._get_collection().find(
+            {"fecha_actualizacion": {"$gte": desde}},
+            {"nombre": 1, "especie": 1, "categoria": 1, "disponible_venta": 1, "estado": 1, "stock": 1}
+        ))
+
+        claves, entradas = list(self._datos[0]), list(self._datos[1])
+        ids_cambiadas = {str(p['_id']) for p in cambiadas}
+        if ids_cambiadas & self._ids:
+            conservar = [i for i, e in enumerate(entradas) if e[0] not in ids_cambiadas]
+            claves = [claves[i] for i in conservar]
+            entradas = [entradas[i] for i in conservar]
+            self._ids -= ids_cambiadas
+
+        for planta in cambiadas:
+            if not (planta.get('disponible_venta') and planta.get('estado') == 'activa'
+                    and (planta.get('stock') or 0) > 0):
+                continue
+            if len(claves) >= self.max_entradas:
+                self._truncado = True
+                break
+            planta_id = str(planta['_id'])
+            for clave in self._claves_planta(planta):
+                posicion = bisect.bisect_right(claves, clave)
+                claves.insert(posicion, clave)
+                entradas.insert(posicion, (planta_id, planta.get('nombre', '')))
+            self._ids.add(planta_id)
+
+        self._datos = (claves, entradas)
+        self._revision = revision
+
+    def _faltan_bajas(self):
+        """Las bajas (delete) no dejan documento que releer: el conteo las delata"""
+        coleccion = PlantaModel._get_collection()
+        if not self._truncado:
+            return coleccion.count_documents(FILTRO_VENTA) != len(self._ids)
+        # Índice cortado: solo se pueden comparar las plantas que sí están indexadas
+        ids = [ObjectId(i) for i in self._ids]
+        return coleccion.count_documents({**FILTRO_VENTA, "_id": {"$in": ids}}) != len(ids)
+
+    def actualizar(self):
+        """Aplica los cambios del catálogo si cambió su revisión; lo llama el hilo del catálogo"""
+        with self._lock:
+            self._comprobado = time.monotonic()
+            revision = RevisionModel.get('catalogo')['revision']
+            if revision == self._revision:
+                return
+            try:
+                if self._revision is None:
+                    self._reconstruir(revision)
+                    return
+                self._actualizar_cambios(revision)
+                if self._faltan_bajas():
+                    self._reconstruir(revision)
+            except Exception as e:
+                logger.error(f"Error actualizando sugerencias: {e}")
+
+    def _sincronizar(self):
+        # En segundo plano la petición solo construye el índice si aún no existe
+        if self.en_segundo_plano and self._revision is not None:
+            return
+        if self._revision is not None and time.monotonic() - self._comprobado < self.intervalo:
+            return
+        self.actualizar()
+
+    def buscar(self, texto, limite=8):
+        """Hasta `limite` plantas con una palabra de nombre, especie o categoría que empieza por `texto`"""
+        self._sincronizar()
+        prefijo = ' '.join(normalizar(texto).split())
+        if not prefijo:
+            return []
+
+        claves, entradas = self._datos
+        resultados, vistos = [], set()
+        i = bisect.bisect_left(claves, prefijo)
+        while i < len(claves) and claves[i].startswith(prefijo) and len(resultados) < limite:
+            planta_id, nombre = entradas[i]
+            if planta_id not in vistos:
+                vistos.add(planta_id)
+                resultados.append({'id': planta_id, 'nombre': nombre})
+            i += 1
+        return resultados
+
+    def estadisticas(self):
+        return {
+            'claves': len(self._datos[0]),
+            'plantas': len(self._ids),
+            'truncado': self._truncado,
+            'max_entradas': self.max_entradas,
+            'revision': self._revision
+        }
+
+
+# Instancia global
+indice_sugerencias = IndiceSugerencias()
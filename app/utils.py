@@ -4,16 +4,9 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import hashlib
 import gzip
-import schedule
 import time
 import threading
 from bson import json_util, ObjectId
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import logging
 
 from app.database import get_db
@@ -25,23 +18,24 @@ class BackupManager:
         self.app = app
         self.backup_dir = None
         
-    def init_app(self, app):
+    def init_app(self, app, iniciar_planificador=True):
         self.app = app
         self.backup_dir = app.config.get('BACKUP_DIR', 'backups')
         
         # Crear directorio de backups si no existe
         Path(self.backup_dir).mkdir(parents=True, exist_ok=True)
         
-        # Iniciar scheduler en un hilo separado
-        self.start_scheduler()
+        # Iniciar scheduler en un hilo separado (los scripts de una sola ejecución no lo necesitan)
+        if iniciar_planificador:
+            self.start_scheduler()
     
     def create_backup(self, backup_type='completo', realizado_por='Sistema'):
         """Crea un respaldo de la base de datos MongoDB"""
         
-        from app import create_app
+        from app import create_cli_app
         
         if not self.app:
-            self.app = create_app()
+            self.app = create_cli_app()
         
         with self.app.app_context():
             # Generar nombre de archivo
@@ -125,6 +119,11 @@ class BackupManager:
     def upload_to_drive(self, filepath, filename):
         """Sube archivo a Google Drive"""
         try:
+            # El cliente de Google es pesado: solo se importa si realmente se sube algo
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build
+            from googleapiclient.http import MediaFileUpload
+            
             SCOPES = ['https://www.googleapis.com/auth/drive.file']
             creds_file = self.app.config.get('GOOGLE_CREDENTIALS_FILE')
             
@@ -192,6 +191,8 @@ class BackupManager:
     
     def start_scheduler(self):
         """Inicia el scheduler interno para backups automáticos"""
+        import schedule
+        
         def job_loop():
             while True:
                 schedule.run_pending()
@@ -227,6 +228,10 @@ class BackupManager:
     def send_alert_email(self, message):
         """Envía alerta por email"""
         try:
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            
             smtp_server = self.app.config['MAIL_SERVER']
             smtp_port = self.app.config['MAIL_PORT']
             username = self.app.config['MAIL_USERNAME']
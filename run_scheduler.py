@@ -4,7 +4,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import create_app
+from app import create_cli_app
 from app.scheduler import backup_scheduler
 import logging
 
@@ -12,7 +12,10 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 if __name__ == '__main__':
-    app = create_app()
+    # La factory mínima no arranca su propio planificador: solo existe el de este proceso
+    app = create_cli_app()
+    if '--perfil' in sys.argv:
+        print(app.extensions['perfil_arranque'].reporte())
     with app.app_context():
         backup_scheduler.start(app)
         print("Planificador iniciado. Presiona Ctrl+C para detener.")
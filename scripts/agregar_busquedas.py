@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Resume el registro de búsquedas de la tienda por día (search_stats_daily).
+Pensado para cron diario (por defecto resume ayer); la aplicación precalienta las
+consultas más frecuentes de estos resúmenes al arrancar y cuando cambia el catálogo.
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.models import BusquedaModel
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumen diario de búsquedas')
+    parser.add_argument('--dia', help='Día a resumir (AAAA-MM-DD, por defecto ayer)')
+    parser.add_argument('--dias', type=int, default=1,
+                       help='Número de días a resumir hacia atrás desde --dia (por defecto 1)')
+    parser.add_argument('--top', type=int, default=20,
+                       help='Consultas populares a mostrar (por defecto 20)')
+
+    args = parser.parse_args()
+    try:
+        dia = datetime.strptime(args.dia, '%Y-%m-%d') if args.dia else datetime.utcnow() - timedelta(days=1)
+    except ValueError:
+        print(f"❌ Fecha inválida: {args.dia}", file=sys.stderr)
+        return 1
+
+    app = create_cli_app()
+
+    with app.app_context():
+        BusquedaModel.crear_indices()
+        for atras in range(args.dias):
+            fecha = dia - timedelta(days=atras)
+            consultas = BusquedaModel.agregar_dia(fecha)
+            print(f"✅ {fecha:%Y-%m-%d}: {consultas} consultas distintas")
+
+        populares = BusquedaModel.populares(dia - timedelta(days=7), args.top)
+
+    print("ℹ️  Más buscadas (7 días): " + (', '.join(populares) or '(ninguna)'))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,7 +11,7 @@ from pathlib import Path
 # Agregar ruta del proyecto
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import create_app
+from app import create_cli_app
 from app.utils import backup_manager
 
 def main():
@@ -23,14 +23,19 @@ def main():
     parser.add_argument('--config', default='development',
                        choices=['development', 'production'],
                        help='Configuración a usar')
+    parser.add_argument('--perfil', action='store_true',
+                       help='Mostrar el tiempo de cada fase del arranque')
     
     args = parser.parse_args()
     
-    # Crear aplicación
-    app = create_app(config_name=args.config)
+    # Crear aplicación mínima (sin blueprints, datos por defecto ni planificador)
+    app = create_cli_app(config_name=args.config)
     
-    # Inicializar backup manager
-    backup_manager.init_app(app)
+    # Inicializar backup manager sin su hilo de tareas periódicas
+    backup_manager.init_app(app, iniciar_planificador=False)
+    
+    if args.perfil:
+        print(app.extensions['perfil_arranque'].reporte())
     
     with app.app_context():
         try:
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Mide la latencia (p50/p99) de /api/v1/plantas con catálogos de varios tamaños.
+Inserta plantas sintéticas marcadas con benchmark_api en una base de pruebas (--db,
+nunca la de producción) y las borra al terminar. Las peticiones pasan por el
+blueprint de la API y la compresión, sin hilos en segundo plano.
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+from datetime import datetime
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.api import api_bp
+from app.catalogo import catalogo_tienda
+from app.compresion import compresion
+from app.database import DB_PRODUCCION
+from app.models import PlantaModel, RevisionModel, CATEGORIAS_PLANTA
+
+CONSULTAS = {
+    'primera_pagina': {},
+    'por_nombre': {'orden': 'nombre'},
+    'por_precio_filtrada': {'orden': 'precio', 'precio_min': 10, 'precio_max': 40},
+    'categoria': {'categoria': 'Interior'},
+    'campos_completos': {'fields': 'id,nombre,especie,descripcion,precio,stock'},
+    'texto': {'q': 'ficus'}
+}
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+def sembrar(coleccion, desde, hasta):
+    ahora = datetime.utcnow()
+    lote = []
+    for i in range(desde, hasta):
+        lote.append({
+            'nombre': f'Ficus {i:07d}' if i % 10 == 0 else f'Planta {i:07d}',
+            'especie': 'Benchmark',
+            'descripcion': 'Planta sintética para medir la API del catálogo',
+            'categoria': CATEGORIAS_PLANTA[i % len(CATEGORIAS_PLANTA)],
+            'precio': round(random.uniform(1, 100), 2),
+            'stock': random.randint(1, 50),
+            'estado': 'activa',
+            'disponible_venta': True,
+            'fecha_actualizacion': ahora,
+            'revision': 1,
+            'benchmark_api': True
+        })
+        if len(lote) >= 5000:
+            coleccion.insert_many(lote, ordered=False)
+            lote = []
+    if lote:
+        coleccion.insert_many(lote, ordered=False)
+
+def crear_app_benchmark():
+    """App mínima: configuración, compresión y la API; no arranca respaldos, recolector ni instantáneas"""
+    app = create_cli_app()
+    compresion.init_app(app)
+    catalogo_tienda.init_app(app)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    return app
+
+def medir(cliente, parametros, peticiones, paginas):
+    """Latencias en ms: primera página y las siguientes siguiendo el cursor"""
+    latencias = []
+    for _ in range(peticiones):
+        actuales = dict(parametros)
+        for _ in range(paginas):
+            inicio = time.perf_counter()
+            respuesta = cliente.get('/api/v1/plantas', query_string=actuales,
+                                    headers={'Accept-Encoding': 'gzip'})
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if respuesta.status_code != 200:
+                raise RuntimeError(f'{respuesta.status_code}: {respuesta.get_data(as_text=True)[:200]}')
+            cuerpo = respuesta.get_data()
+            if respuesta.content_encoding == 'gzip':
+                cuerpo = gzip.decompress(cuerpo)
+            cursor = json.loads(cuerpo).get('siguiente')
+            if not cursor:
+                break
+            actuales['cursor'] = cursor
+    return latencias
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de /api/v1/plantas')
+    parser.add_argument('--db', required=True,
+                       help='Base de datos de pruebas donde sembrar las plantas (no puede ser la de producción)')
+    parser.add_argument('--mongo-uri', default=os.getenv('MONGO_URI'),
+                       help='URI de MongoDB (por defecto MONGO_URI)')
+    parser.add_argument('--tamanos', default='1000,10000,100000',
+                       help='Tamaños de catálogo sintético separados por comas')
+    parser.add_argument('--peticiones', type=int, default=200,
+                       help='Repeticiones de cada consulta por tamaño (por defecto 200)')
+    parser.add_argument('--paginas', type=int, default=3,
+                       help='Páginas seguidas por cursor en cada repetición (por defecto 3)')
+
+    args = parser.parse_args()
+    tamanos = sorted(int(t) for t in args.tamanos.split(','))
+
+    if args.db in (DB_PRODUCCION, os.getenv('MONGO_DB', DB_PRODUCCION)):
+        print(f"❌ --db debe ser una base de pruebas distinta de la configurada ({args.db})")
+        return 1
+    # get_db() lee estas variables en cada llamada: todo el script usa la base de pruebas
+    os.environ['MONGO_DB'] = args.db
+    if args.mongo_uri:
+        os.environ['MONGO_URI'] = args.mongo_uri
+
+    app = crear_app_benchmark()
+    cliente = app.test_client()
+
+    with app.app_context():
+        coleccion = PlantaModel._get_collection()
+        PlantaModel.crear_indices()
+        print(f"ℹ️  Se insertan plantas sintéticas (benchmark_api) en '{args.db}' y se borran al terminar")
+
+        sembradas = 0
+        try:
+            for tamano in tamanos:
+                sembrar(coleccion, sembradas, tamano)
+                sembradas = tamano
+                print(f"\nCatálogo sintético: {tamano} plantas")
+                print(f"   {'consulta':<22} {'p50 ms':>8} {'p99 ms':>8} {'peticiones':>11}")
+                for nombre, parametros in CONSULTAS.items():
+                    # Sin cabeceras condicionales el ETag no evita ejecutar la consulta
+                    latencias = medir(cliente, parametros, args.peticiones, args.paginas)
+                    print(f"   {nombre:<22} {percentil(latencias, 50):8.2f} "
+                          f"{percentil(latencias, 99):8.2f} {len(latencias):11d}")
+        finally:
+            borradas = coleccion.delete_many({'benchmark_api': True}).deleted_count
+            # Invalida búsquedas cacheadas y ETags que aún contengan las plantas sintéticas
+            RevisionModel.incrementar('catalogo')
+            print(f"\n✅ Plantas sintéticas borradas: {borradas}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
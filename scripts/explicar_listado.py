@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Muestra el plan ganador (explain) de las consultas del listado de administración
+para cada orden de ORDENES_LISTADO y avisa si alguna necesita un SORT en memoria.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.models import PlantaModel, ORDENES_LISTADO, PROYECCION_LISTADO, COLACION_ES
+
+def etapas(plan):
+    """Etapas del plan de arriba abajo: [(etapa, índice o None)]"""
+    resultado = []
+    while plan:
+        resultado.append((plan.get('stage'), plan.get('indexName')))
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description='explain() de las consultas del listado de plantas')
+    parser.add_argument('--usuario', help='_id de un usuario no administrador para las consultas filtradas por usuario')
+    parser.add_argument('--categoria', default='Interior', help='Categoría para la consulta filtrada (por defecto Interior)')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+    filtros = {
+        'admin': {},
+        'categoria': {'categoria': args.categoria},
+        'prefijo': {'prefijo': 'ro'},
+        'stock_max': {'stock_max': 5}
+    }
+    if args.usuario:
+        filtros['usuario'] = {'usuario_id': args.usuario}
+
+    con_sort = 0
+    with app.app_context():
+        PlantaModel.crear_indices()
+        coleccion = PlantaModel._get_collection()
+        for nombre_filtro, parametros in filtros.items():
+            filtro = PlantaModel.filtro_listado(**parametros)
+            for orden, claves in ORDENES_LISTADO.items():
+                plan = (coleccion.find(filtro, PROYECCION_LISTADO, collation=COLACION_ES)
+                        .sort(claves).limit(20).explain())
+                pasos = etapas(plan['queryPlanner']['winningPlan'])
+                indice = next((i for _, i in pasos if i), '-')
+                sort = any(etapa == 'SORT' for etapa, _ in pasos)
+                con_sort += sort
+                marca = '❌ SORT' if sort else '✅'
+                print(f"   {nombre_filtro:<10} {orden:<12} {indice:<28} {marca}")
+
+    if con_sort:
+        print(f"❌ Consultas con SORT en memoria: {con_sort}")
+        return 1
+    print("✅ Todas las consultas del listado ordenan con un índice")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
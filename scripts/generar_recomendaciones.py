@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Recalcula las recomendaciones "comprados juntos" de la tienda a partir de los pedidos.
+Pensado para cron (p. ej. cada noche); la ficha de producto solo lee el resultado.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.recomendaciones import generar_recomendaciones, TOP_VECINOS, MIN_COINCIDENCIAS
+
+def main():
+    parser = argparse.ArgumentParser(description='Recomendaciones por compras conjuntas')
+    parser.add_argument('--top', type=int, default=TOP_VECINOS,
+                       help=f'Vecinos guardados por planta (por defecto {TOP_VECINOS})')
+    parser.add_argument('--min-coincidencias', type=int, default=MIN_COINCIDENCIAS,
+                       help=f'Pedidos en común mínimos para recomendar (por defecto {MIN_COINCIDENCIAS})')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+
+    with app.app_context():
+        informe = generar_recomendaciones(top_n=args.top, min_coincidencias=args.min_coincidencias)
+
+    print(f"✅ Pedidos analizados: {informe['pedidos']}, plantas con recomendaciones: {informe['plantas']}, "
+          f"vecinos guardados: {informe['pares']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
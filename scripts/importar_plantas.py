@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de plantas desde CSV o NDJSON (p. ej. el catálogo de un proveedor).
+Lee el archivo por flujo, escribe en lotes de bulk_write y muestra el informe de errores por fila.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.models import UsuarioModel, PlantaModel
+from app.importacion import leer_filas, importar_plantas, TAMANO_LOTE
+
+def main():
+    parser = argparse.ArgumentParser(description='Importación masiva de plantas')
+    parser.add_argument('archivo', help='Ruta del archivo .csv o .ndjson')
+    parser.add_argument('--usuario', required=True,
+                       help='Correo del usuario propietario de las plantas importadas')
+    parser.add_argument('--formato', choices=['csv', 'ndjson'],
+                       help='Formato del archivo (por defecto según la extensión)')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                       help=f'Operaciones por bulk_write (por defecto {TAMANO_LOTE})')
+    parser.add_argument('--informe', help='Guardar el informe completo en este archivo JSON')
+
+    args = parser.parse_args()
+    formato = args.formato or ('ndjson' if args.archivo.lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+
+    app = create_cli_app()
+
+    with app.app_context():
+        usuario = UsuarioModel.get_by_email(args.usuario)
+        if not usuario:
+            print(f"❌ No existe el usuario {args.usuario}", file=sys.stderr)
+            return 1
+
+        PlantaModel.crear_indices()
+        with open(args.archivo, 'rb') as f:
+            informe = importar_plantas(leer_filas(f, formato), usuario['_id'],
+                                       solo_propias=usuario.get('rol') != 'admin', tamano_lote=args.lote)
+
+    for error in informe['errores']:
+        print(f"⚠️  Fila {error['fila']}: {'; '.join(error['errores'])}", file=sys.stderr)
+    print(f"✅ Filas: {informe['filas']}, insertadas: {informe['insertadas']}, "
+          f"actualizadas: {informe['actualizadas']}, con error: {informe['con_error']}")
+
+    if args.informe:
+        with open(args.informe, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+
+    return 0 if informe['con_error'] == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
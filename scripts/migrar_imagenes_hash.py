@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Migra las imágenes subidas con nombre planta_<id>_<timestamp>.<ext> al almacenamiento
+por contenido (<sha256>.<ext>): deduplica archivos idénticos, actualiza las plantas
+y reconstruye los contadores de referencias de la colección images.
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+from datetime import datetime
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.database import get_db
+from app.models import RevisionModel
+
+def hash_archivo(ruta):
+    sha256 = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(65536), b''):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+def es_nombre_por_contenido(nombre):
+    base = os.path.splitext(nombre)[0]
+    return len(base) == 64 and all(c in '0123456789abcdef' for c in base)
+
+def main():
+    parser = argparse.ArgumentParser(description='Migración de imágenes a almacenamiento por contenido')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Solo informar qué se haría, sin tocar archivos ni la base de datos')
+    parser.add_argument('--conservar', action='store_true',
+                       help='No borrar los archivos originales tras migrarlos')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+    carpeta = app.config['PLANTAS_UPLOAD_FOLDER']
+
+    with app.app_context():
+        db = get_db()
+        migradas, duplicadas, faltantes = 0, 0, 0
+        bytes_ahorrados = 0
+        originales = set()
+
+        filtro = {'imagen_nombre': {'$nin': [None, '']}}
+        for planta in db.plants.find(filtro, {'imagen_nombre': 1, 'imagen_hash': 1}):
+            nombre = planta['imagen_nombre']
+            if planta.get('imagen_hash') and es_nombre_por_contenido(nombre):
+                continue
+
+            ruta = os.path.join(carpeta, nombre)
+            if not os.path.exists(ruta):
+                faltantes += 1
+                print(f"⚠️  {planta['_id']}: no existe {nombre}", file=sys.stderr)
+                continue
+
+            hash_contenido = hash_archivo(ruta)
+            ext = os.path.splitext(nombre)[1].lower().lstrip('.') or 'jpg'
+            ext = 'jpg' if ext == 'jpeg' else ext
+            nuevo_nombre = f"{hash_contenido}.{ext}"
+            destino = os.path.join(carpeta, nuevo_nombre)
+
+            if os.path.exists(destino) and destino != ruta:
+                duplicadas += 1
+                bytes_ahorrados += os.path.getsize(ruta)
+
+            print(f"{'[dry-run] ' if args.dry_run else ''}{nombre} -> {nuevo_nombre}")
+            if args.dry_run:
+                migradas += 1
+                continue
+
+            if not os.path.exists(destino):
+                # Copia (no mueve): otra planta podría seguir apuntando al original
+                with open(ruta, 'rb') as origen, open(destino + '.tmp', 'wb') as copia:
+                    for bloque in iter(lambda: origen.read(65536), b''):
+                        copia.write(bloque)
+                os.replace(destino + '.tmp', destino)
+            if destino != ruta:
+                originales.add(ruta)
+
+            # Los derivados se nombran por el original: se regeneran con procesar_imagenes.py
+            db.plants.update_one(
+                {'_id': planta['_id']},
+                {
+                    '$set': {
+                        'imagen_nombre': nuevo_nombre,
+                        'imagen_hash': hash_contenido,
+                        'imagen_path': f'uploads/plantas/{nuevo_nombre}',
+                        'imagenes': None,
+                        'imagen_estado': 'pendiente',
+                        'fecha_actualizacion': datetime.utcnow()
+                    },
+                    '$inc': {'revision': 1}
+                }
+            )
+            migradas += 1
+
+        if not args.dry_run:
+            # Contadores reconstruidos desde cero a partir de las plantas
+            conteos = db.plants.aggregate([
+                {'$match': {'imagen_hash': {'$nin': [None, '']}}},
+                {'$group': {'_id': '$imagen_hash', 'archivo': {'$first': '$imagen_nombre'}, 'referencias': {'$sum': 1}}}
+            ])
+            db.images.delete_many({})
+            for conteo in conteos:
+                ruta = os.path.join(carpeta, conteo['archivo'])
+                db.images.insert_one({
+                    '_id': conteo['_id'],
+                    'archivo': conteo['archivo'],
+                    'referencias': conteo['referencias'],
+                    'tamano': os.path.getsize(ruta) if os.path.exists(ruta) else 0,
+                    'fecha_creacion': datetime.utcnow()
+                })
+
+            if not args.conservar:
+                for ruta in originales:
+                    try:
+                        os.remove(ruta)
+                    except OSError as e:
+                        print(f"⚠️  No se pudo borrar {ruta}: {e}", file=sys.stderr)
+
+            if migradas:
+                RevisionModel.incrementar('catalogo')
+
+        print(f"✅ Imágenes migradas: {migradas} (duplicadas: {duplicadas}, "
+              f"{bytes_ahorrados / 1024 / 1024:.1f} MB ahorrados, faltantes: {faltantes})")
+        if migradas and not args.dry_run:
+            print("ℹ️  Ejecuta scripts/procesar_imagenes.py para regenerar los derivados")
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
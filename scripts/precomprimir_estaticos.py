@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Genera versiones .gz/.br de los estáticos (CSS, JS, SVG...) para servirlos
+sin comprimir en cada petición. Ejecutar en cada despliegue.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.compresion import precomprimir_directorio, brotli
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'static')
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompresión de archivos estáticos')
+    parser.add_argument('--directorio', default=STATIC_DIR, help='Carpeta de estáticos')
+    parser.add_argument('--nivel-gzip', type=int, default=9, help='Nivel de gzip (1-9)')
+    parser.add_argument('--nivel-br', type=int, default=11, help='Calidad de brotli (0-11)')
+    
+    args = parser.parse_args()
+    
+    if brotli is None:
+        print("⚠️  Módulo 'brotli' no instalado: solo se generarán archivos .gz")
+    
+    resumen = precomprimir_directorio(args.directorio, nivel_gzip=args.nivel_gzip, nivel_br=args.nivel_br)
+    
+    print(f"✅ {resumen['archivos']} archivos revisados, {resumen['generados']} versiones generadas")
+    if resumen['bytes_originales']:
+        print(f"   Original: {resumen['bytes_originales'] / 1024:.1f} KB")
+        print(f"   gzip:     {resumen['bytes_gzip'] / 1024:.1f} KB")
+        if brotli is not None:
+            print(f"   brotli:   {resumen['bytes_br'] / 1024:.1f} KB")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Genera los derivados (thumb/card/detail en WebP y JPEG) y el marcador LQIP de las
+imágenes de plantas que quedaron pendientes o con error, o de todas las que aún no los tienen.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.database import get_db
+from app.imagenes import procesador_imagenes
+
+def main():
+    parser = argparse.ArgumentParser(description='Procesado de imágenes de plantas')
+    parser.add_argument('--todas', action='store_true',
+                       help='Procesar todas las imágenes subidas sin derivados o sin LQIP, no solo las pendientes')
+    
+    args = parser.parse_args()
+    
+    app = create_cli_app()
+    procesador_imagenes.init_app(app)
+    
+    with app.app_context():
+        if args.todas:
+            filtro = {
+                'imagen_nombre': {'$nin': [None, '']},
+                '$or': [{'imagenes': {'$in': [None, {}]}}, {'imagen_lqip': None}]
+            }
+        else:
+            filtro = {'imagen_estado': {'$in': ['pendiente', 'error']}}
+        
+        procesadas, errores = 0, 0
+        for planta in get_db().plants.find(filtro, {'imagen_nombre': 1}):
+            try:
+                procesador_imagenes.procesar(str(planta['_id']), planta['imagen_nombre'])
+                procesadas += 1
+            except Exception as e:
+                errores += 1
+                print(f"❌ {planta['imagen_nombre']}: {str(e)}", file=sys.stderr)
+        
+        print(f"✅ Imágenes procesadas: {procesadas} (errores: {errores})")
+        return 0 if errores == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
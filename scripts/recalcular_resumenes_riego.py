@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Reconstruye la colección watering_rollups (totales de riego por planta y día/semana)
+agregando watering_logs en el servidor. Después la mantiene cada riego registrado.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.database import get_db
+from app.models import ResumenRiegoModel
+
+def pipeline_resumen(periodo):
+    """Agrupa los riegos por planta y periodo y los vuelca con $merge (requiere MongoDB 5.0+)"""
+    unidad = {'unit': 'day'} if periodo == 'dia' else {'unit': 'week', 'startOfWeek': 'monday'}
+    return [
+        {'$group': {
+            '_id': {
+                'id_planta': '$id_planta',
+                'inicio': {'$dateTrunc': {'date': '$fecha_riego', **unidad}}
+            },
+            'riegos': {'$sum': 1},
+            'cantidad_agua': {'$sum': {'$ifNull': ['$cantidad_agua', 0]}},
+            'primer_riego': {'$min': '$fecha_riego'},
+            'ultimo_riego': {'$max': '$fecha_riego'}
+        }},
+        {'$project': {
+            '_id': 0,
+            'id_planta': '$_id.id_planta',
+            'periodo': {'$literal': periodo},
+            'inicio': '$_id.inicio',
+            'riegos': 1,
+            'cantidad_agua': 1,
+            'primer_riego': 1,
+            'ultimo_riego': 1
+        }},
+        {'$merge': {
+            'into': 'watering_rollups',
+            'on': ['id_planta', 'periodo', 'inicio'],
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert'
+        }}
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill de los resúmenes de riego')
+    parser.add_argument('--limpiar', action='store_true',
+                       help='Vaciar watering_rollups antes de reconstruir (descarta resúmenes huérfanos)')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+
+    with app.app_context():
+        db = get_db()
+        # $merge necesita el índice único sobre los campos 'on'
+        ResumenRiegoModel.crear_indices()
+        if args.limpiar:
+            db.watering_rollups.delete_many({})
+
+        for periodo in ResumenRiegoModel.PERIODOS:
+            db.watering_logs.aggregate(pipeline_resumen(periodo), allowDiskUse=True)
+            total = db.watering_rollups.count_documents({'periodo': periodo})
+            print(f"✅ Resúmenes '{periodo}': {total}")
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Calcula ultimo_riego_at y next_watering_at de todas las plantas a partir de watering_logs.
+Necesario una vez para los datos anteriores al campo; después lo mantiene guardar_riego.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+from app import create_cli_app
+from app.database import get_db
+from app.models import PlantaModel
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill de next_watering_at')
+    parser.add_argument('--lote', type=int, default=1000,
+                       help='Actualizaciones por bulk_write (por defecto 1000)')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+
+    with app.app_context():
+        db = get_db()
+        PlantaModel.crear_indices()
+
+        # Último riego por planta, agregado en el servidor (una entrada por planta)
+        ultimos = {
+            r['_id']: r['ultimo']
+            for r in db.watering_logs.aggregate([
+                {'$group': {'_id': '$id_planta', 'ultimo': {'$max': '$fecha_riego'}}}
+            ], allowDiskUse=True)
+        }
+
+        operaciones, actualizadas = [], 0
+        proyeccion = {'intervalo_riego_dias': 1, 'fecha_registro': 1}
+        for planta in db.plants.find({}, proyeccion).batch_size(args.lote):
+            planta['ultimo_riego_at'] = ultimos.get(planta['_id'])
+            operaciones.append(UpdateOne({'_id': planta['_id']}, {'$set': {
+                'ultimo_riego_at': planta['ultimo_riego_at'],
+                'next_watering_at': PlantaModel.proxima_fecha_riego(planta)
+            }}))
+            if len(operaciones) >= args.lote:
+                actualizadas += db.plants.bulk_write(operaciones, ordered=False).matched_count
+                operaciones = []
+
+        if operaciones:
+            actualizadas += db.plants.bulk_write(operaciones, ordered=False).matched_count
+
+        print(f"✅ Plantas actualizadas: {actualizadas} (con riegos: {len(ultimos)})")
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
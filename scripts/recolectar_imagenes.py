@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Informa (por defecto) o retira las imágenes de uploads/plantas que ya no usa ninguna planta.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.recolector_imagenes import recolector_imagenes
+
+def main():
+    parser = argparse.ArgumentParser(description='Recolector de imágenes huérfanas')
+    parser.add_argument('--aplicar', action='store_true',
+                       help='Retirar los archivos; sin esta opción solo se muestra el informe (dry-run)')
+    parser.add_argument('--borrar', action='store_true',
+                       help='Borrar definitivamente en lugar de mover a cuarentena')
+    parser.add_argument('--gracia-horas', type=float, default=None,
+                       help='Antigüedad mínima de un archivo para considerarlo huérfano')
+    parser.add_argument('--max-por-segundo', type=int, default=None,
+                       help='Máximo de archivos retirados por segundo')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+    recolector_imagenes.init_app(app)
+
+    with app.app_context():
+        informe = recolector_imagenes.barrer(
+            dry_run=not args.aplicar,
+            gracia_horas=args.gracia_horas,
+            max_por_segundo=args.max_por_segundo,
+            cuarentena=False if args.borrar else None
+        )
+
+    for nombre in informe['huerfanos']:
+        print(f"{'[dry-run] ' if informe['dry_run'] else ''}{nombre}")
+    print(f"✅ Revisados: {informe['revisados']}, referenciados: {informe['referenciados']}, "
+          f"huérfanos: {len(informe['huerfanos'])} ({informe['bytes'] / 1024 / 1024:.1f} MB), "
+          f"errores: {informe['errores']}")
+    return 0 if informe['errores'] == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Materializa (o recalcula) store_categories y store_category_cards, las páginas de categoría de la tienda.
+Necesario una vez tras desplegar; después la mantiene al día el hilo del catálogo de la
+tienda, que recalcula las categorías que marcan las escrituras de plantas.
+"""
+
+import os
+import sys
+import argparse
+
+# Agregar ruta del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_cli_app
+from app.models import CategoriaTiendaModel
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresco de la vista materializada de categorías')
+    parser.add_argument('categorias', nargs='*',
+                       help='Categorías a recalcular (por defecto todas)')
+
+    args = parser.parse_args()
+
+    app = create_cli_app()
+
+    with app.app_context():
+        CategoriaTiendaModel.crear_indices()
+        CategoriaTiendaModel.refrescar(args.categorias or None)
+        vistas = list(CategoriaTiendaModel._get_collection().find({}, {'categoria': 1, 'total': 1}))
+
+    for vista in vistas:
+        print(f"   {vista['_id']:<20} {vista.get('total', 0):6d} plantas")
+    print(f"✅ Categorías materializadas: {len(vistas)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())